@@ -0,0 +1,224 @@
+"""Offline harvest benchmark: synthetic channels replayed through the harvester stages.
+
+    python benchmarks/bench_harvest.py --channels 2 --videos 1000 --comments 40
+    python benchmarks/bench_harvest.py --json results.json --check
+
+A deterministic fake YouTube client (fake_youtube.py) serves paginated responses
+and an SQLite stand-in (sqlite_db.py) takes the writes, so neither an API key
+nor a MySQL server is needed. Each stage reports API calls, DB round trips,
+rows, rows per second and peak traced memory. Memory is measured in a second,
+traced pass so tracemalloc does not distort the timings. For the videos and
+comments stages the same pass also measures the memory the fetched record
+batches hold per row, counting Python objects and Arrow buffers together.
+
+--check exits non-zero if a stage made a different number of API calls than
+the synthetic data requires, wrote fewer rows than expected, or ran slower
+than --min-rows-per-second.
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fake_youtube import FakeYouTube  # noqa: E402
+from harvester import (  # noqa: E402
+    COMMENT_PAGE_SIZE,
+    get_channel_info,
+    get_comment_info,
+    get_playlist_details,
+    get_video_info,
+    get_videos_ids,
+    insert_channel_info,
+    insert_comment_info,
+    insert_playlist_details,
+    insert_video_info,
+)
+from sqlite_db import SQLiteConnection  # noqa: E402
+
+STAGES = ['channel', 'playlists', 'video_ids', 'videos', 'comments']
+
+
+# Function to make a deterministic channel ID for the i-th synthetic channel
+def channel_id(i):
+    return f"UCbench{i:017d}"
+
+
+# Function to run one stage for every channel; returns the number of rows it produced
+def run_stage(stage, youtube, conn, channel_ids, video_ids, include_replies):
+    rows = 0
+    for channel in channel_ids:
+        if stage == 'channel':
+            rows += insert_channel_info(conn, get_channel_info(youtube, channel))
+        elif stage == 'playlists':
+            rows += insert_playlist_details(conn, get_playlist_details(youtube, channel))
+        elif stage == 'video_ids':
+            video_ids[channel] = get_videos_ids(youtube, channel)
+            rows += len(video_ids[channel])
+        elif stage == 'videos':
+            rows += insert_video_info(conn, get_video_info(youtube, video_ids[channel]))
+        elif stage == 'comments':
+            rows += insert_comment_info(conn, get_comment_info(youtube, video_ids[channel], include_replies), channel)
+    return rows
+
+
+# Function to fetch the data of the videos or comments stage for every channel without writing it
+def fetch_stage(stage, youtube, channel_ids, video_ids, include_replies):
+    if stage == 'videos':
+        return [get_video_info(youtube, video_ids[channel]) for channel in channel_ids]
+    return [get_comment_info(youtube, video_ids[channel], include_replies) for channel in channel_ids]
+
+
+# Function to measure the memory held by a stage's fetched data, Python objects and Arrow buffers together
+def held_bytes(stage, youtube, channel_ids, video_ids, include_replies):
+    gc.collect()
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    fetched = fetch_stage(stage, youtube, channel_ids, video_ids, include_replies)
+    held = tracemalloc.get_traced_memory()[0] + pa.total_allocated_bytes() - arrow_before
+    tracemalloc.stop()
+    del fetched
+    return held
+
+
+# Function to compute the API calls and rows each stage must produce for the synthetic data
+def expected_counts(youtube, channels, include_replies):
+    videos = youtube.videos_per_channel
+    numbers = range(videos)
+    deleted = sum(1 for n in numbers if youtube.deleted_every and n % youtube.deleted_every == youtube.deleted_every - 1)
+    disabled = sum(1 for n in numbers if youtube.disabled_every and n % youtube.disabled_every == youtube.disabled_every - 1)
+    open_videos = videos - disabled
+    comment_pages = max(1, math.ceil(youtube.comments_per_video / COMMENT_PAGE_SIZE))
+    comment_rows = youtube.comments_per_video
+    comment_calls = open_videos * comment_pages + disabled
+    if include_replies and youtube.replies_per_comment:
+        comment_rows += youtube.comments_per_video * youtube.replies_per_comment
+        if youtube.replies_per_comment > 5:
+            # Threads with more replies than the API embeds are paged through comments().list
+            reply_pages = max(1, math.ceil(youtube.replies_per_comment / COMMENT_PAGE_SIZE))
+            comment_calls += open_videos * youtube.comments_per_video * reply_pages
+    per_channel = {
+        'channel': (1, 1),
+        'playlists': (max(1, math.ceil(youtube.playlists_per_channel / 50)), youtube.playlists_per_channel),
+        'video_ids': (1 + max(1, math.ceil(videos / 50)), videos),
+        'videos': (max(1, math.ceil(videos / 50)), videos - deleted),
+        'comments': (comment_calls, open_videos * comment_rows),
+    }
+    return {stage: (calls * channels, rows * channels) for stage, (calls, rows) in per_channel.items()}
+
+
+# Function to run every stage twice (timed, then traced for memory) and collect the measurements
+def run_benchmark(args):
+    youtube = FakeYouTube(args.videos, args.comments, args.replies, args.playlists)
+    include_replies = args.replies > 0
+    channel_ids = [channel_id(i) for i in range(args.channels)]
+    expected = expected_counts(youtube, args.channels, include_replies)
+    conn = SQLiteConnection(args.db)
+    results = []
+    video_ids = {}
+    for stage in STAGES:
+        youtube.reset_calls()
+        round_trips = conn.round_trips
+        start = time.perf_counter()
+        rows = run_stage(stage, youtube, conn, channel_ids, video_ids, include_replies)
+        elapsed = time.perf_counter() - start
+        calls = youtube.total_calls
+        round_trips = conn.round_trips - round_trips
+
+        peak = None
+        held_per_row = None
+        if not args.no_memory:
+            tracemalloc.start()
+            run_stage(stage, youtube, conn, channel_ids, video_ids, include_replies)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if stage in ('videos', 'comments') and rows:
+                held_per_row = round(held_bytes(stage, youtube, channel_ids, video_ids, include_replies) / rows, 1)
+
+        expected_calls, expected_rows = expected[stage]
+        results.append({
+            'stage': stage,
+            'seconds': round(elapsed, 4),
+            'api_calls': calls,
+            'expected_api_calls': expected_calls,
+            'db_round_trips': round_trips,
+            'rows': rows,
+            'expected_rows': expected_rows,
+            'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'peak_memory_bytes': peak,
+            'held_bytes_per_row': held_per_row,
+        })
+    conn.close()
+    return results
+
+
+# Function to list the regressions found in a set of results
+def check_results(results, min_rows_per_second):
+    problems = []
+    for result in results:
+        if result['api_calls'] != result['expected_api_calls']:
+            problems.append(f"{result['stage']}: {result['api_calls']} API calls, "
+                            f"expected {result['expected_api_calls']}")
+        if result['rows'] < result['expected_rows']:
+            problems.append(f"{result['stage']}: {result['rows']} rows, expected {result['expected_rows']}")
+        if min_rows_per_second and result['stage'] in ('videos', 'comments') and \
+                (result['rows_per_second'] or 0) < min_rows_per_second:
+            problems.append(f"{result['stage']}: {result['rows_per_second']} rows/s, "
+                            f"below {min_rows_per_second}")
+    return problems
+
+
+# Function to print the results as a table
+def print_results(results):
+    print(f"{'stage':<10} {'seconds':>8} {'API calls':>10} {'DB trips':>9} {'rows':>9} {'rows/s':>11} {'peak MiB':>9} "
+          f"{'held B/row':>11}")
+    for r in results:
+        peak = f"{r['peak_memory_bytes'] / 2 ** 20:.1f}" if r['peak_memory_bytes'] is not None else '-'
+        held = f"{r['held_bytes_per_row']:.0f}" if r['held_bytes_per_row'] is not None else '-'
+        print(f"{r['stage']:<10} {r['seconds']:>8.3f} {r['api_calls']:>10} {r['db_round_trips']:>9} "
+              f"{r['rows']:>9} {r['rows_per_second'] or 0:>11,.0f} {peak:>9} {held:>11}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the harvester offline against synthetic channels.")
+    parser.add_argument('--channels', type=int, default=1, help="synthetic channels to harvest (default: 1)")
+    parser.add_argument('--videos', type=int, default=500, help="videos per channel (default: 500)")
+    parser.add_argument('--comments', type=int, default=40, help="comment threads per video (default: 40)")
+    parser.add_argument('--replies', type=int, default=0, help="replies per thread; >0 harvests replies")
+    parser.add_argument('--playlists', type=int, default=12, help="playlists per channel (default: 12)")
+    parser.add_argument('--db', default=':memory:', help="SQLite database path (default: in memory)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced pass that measures peak memory")
+    parser.add_argument('--json', help="also write the results to this file as JSON")
+    parser.add_argument('--check', action='store_true', help="exit non-zero on API call or row count regressions")
+    parser.add_argument('--min-rows-per-second', type=float, default=0,
+                        help="with --check, minimum rows/s for the videos and comments stages")
+    parser.add_argument('--verbose', action='store_true', help="show harvester log output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    results = run_benchmark(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump({'parameters': vars(args), 'stages': results}, handle, indent=2)
+    if args.check:
+        problems = check_results(results, args.min_rows_per_second)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Startup benchmark: cold and warm reruns of the Streamlit app.
+
+    python benchmarks/bench_startup.py --processes 3 --reruns 5
+    python benchmarks/bench_startup.py --json startup.json
+
+Streamlit executes the whole script on every interaction. The app is run
+headless with streamlit's AppTest in fresh interpreters. The cold run is the
+first script run of a process, including the imports of the app's modules.
+Warm reruns are what every later interaction costs. Building the YouTube
+client is timed separately, for the first time and for a reuse, and so is
+drawing the first chart, which is when matplotlib gets imported. Neither
+MySQL nor the network is needed. Connection errors are part of the page
+and do not affect the timings.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+APP_PATH = os.path.join(SRC_DIR, 'youtube_data_harvesting.py')
+
+
+# Function to take one set of measurements in the current (fresh) interpreter
+def measure(reruns):
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit_import = time.perf_counter() - start
+
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        warm.append(time.perf_counter() - start)
+    plotting_imported = 'matplotlib.pyplot' in sys.modules
+
+    sys.path.insert(0, SRC_DIR)
+    from harvester import youtube_client
+    start = time.perf_counter()
+    youtube_client('startup-benchmark-key')
+    client_first = time.perf_counter() - start
+    start = time.perf_counter()
+    youtube_client('startup-benchmark-key')
+    client_reuse = time.perf_counter() - start
+
+    import pandas as pd
+    start = time.perf_counter()
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    ax.bar(range(3), pd.Series([1, 2, 3]))
+    plt.close(fig)
+    first_chart = time.perf_counter() - start
+    return {
+        'streamlit_import': streamlit_import,
+        'cold_run': cold,
+        'warm_run': statistics.median(warm) if warm else None,
+        'client_first': client_first,
+        'client_reuse': client_reuse,
+        'first_chart': first_chart,
+        'plotting_imported_at_startup': plotting_imported,
+    }
+
+
+# Function to measure in a fresh interpreter per process; the caches and state files go to a scratch directory
+def run_benchmark(args):
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for _ in range(args.processes):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', '--reruns', str(args.reruns)],
+                cwd=scratch, capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+# Function to print the median of every measurement over the processes
+def print_results(results):
+    print(f"{'measurement':<18} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for key in ('streamlit_import', 'cold_run', 'warm_run', 'client_first', 'client_reuse', 'first_chart'):
+        values = [result[key] * 1000 for result in results if result[key] is not None]
+        if values:
+            print(f"{key:<18} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+    imported = any(result['plotting_imported_at_startup'] for result in results)
+    print(f"matplotlib imported before any chart was drawn: {'yes' if imported else 'no'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold and warm reruns of the Streamlit app.")
+    parser.add_argument('--processes', type=int, default=3, help="fresh interpreters to measure (default: 3)")
+    parser.add_argument('--reruns', type=int, default=5, help="warm reruns per process (default: 5)")
+    parser.add_argument('--json', help="also write the results to this file as JSON")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        print(json.dumps(measure(args.reruns)))
+        return 0
+    results = run_benchmark(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump({'parameters': vars(args), 'processes': results}, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
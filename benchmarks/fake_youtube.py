@@ -0,0 +1,222 @@
+"""Deterministic stand-in for build('youtube', 'v3') used by the offline benchmarks.
+
+Every channel, video and comment is derived from its ID, so two runs with the
+same sizes see identical responses. Responses are paginated the way the real
+API paginates them, and every list() request is counted per endpoint.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+DURATIONS = ["PT4M13S", "PT12M", "PT59S", "PT1H2M3S", "PT25M40S", "P1DT2H", "PT8M8S"]
+EPOCH = datetime(2015, 1, 1)
+
+
+class FakeRequest:
+    def __init__(self, client, endpoint, handler, params):
+        self.client = client
+        self.endpoint = endpoint
+        self.handler = handler
+        self.params = params
+
+    def execute(self, http=None, num_retries=0):
+        self.client.count(self.endpoint)
+        return self.handler(**self.params)
+
+
+class FakeResource:
+    def __init__(self, client, endpoint, handler):
+        self.client = client
+        self.endpoint = endpoint
+        self.handler = handler
+
+    def list(self, **params):
+        return FakeRequest(self.client, self.endpoint, self.handler, params)
+
+
+# Function to slice a list of items into one API response page with a nextPageToken
+def page(items, page_token, max_results):
+    start = int(page_token or 0)
+    response = {'items': items[start:start + max_results], 'pageInfo': {'totalResults': len(items)}}
+    if start + max_results < len(items):
+        response['nextPageToken'] = str(start + max_results)
+    return response
+
+
+# Function to build the HttpError the API returns when comments are disabled on a video
+def comments_disabled_error(video_id):
+    content = (
+        b'{"error": {"code": 403, "message": "The video identified by the videoId parameter has disabled comments.",'
+        b' "errors": [{"reason": "commentsDisabled"}]}}'
+    )
+    return HttpError(Response({'status': 403}), content, uri=f"commentThreads?videoId={video_id}")
+
+
+class FakeYouTube:
+    """A synthetic channel set: `videos` uploads per channel and `comments` threads per video.
+
+    Every `deleted_every`-th video is missing from videos().list (deleted or private)
+    and every `disabled_every`-th video has comments disabled.
+    """
+
+    def __init__(self, videos=500, comments=40, replies=0, playlists=12, deleted_every=97, disabled_every=23):
+        self.videos_per_channel = videos
+        self.comments_per_video = comments
+        self.replies_per_comment = replies
+        self.playlists_per_channel = playlists
+        self.deleted_every = deleted_every
+        self.disabled_every = disabled_every
+        self.calls = {}
+        self.channel_of_video = {}
+        self._lock = threading.Lock()
+
+    def count(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    # Synthetic data, all derived from IDs
+    def video_ids(self, channel_id):
+        video_ids = [f"{channel_id[-5:]}{i:06d}" for i in range(self.videos_per_channel)]
+        self.channel_of_video.update((video_id, channel_id) for video_id in video_ids)
+        return video_ids
+
+    @staticmethod
+    def video_number(video_id):
+        return int(video_id[-6:])
+
+    @staticmethod
+    def timestamp(offset_seconds, fraction=False):
+        value = EPOCH + timedelta(seconds=offset_seconds)
+        suffix = f".{offset_seconds % 1000:03d}Z" if fraction else "Z"
+        return value.strftime('%Y-%m-%dT%H:%M:%S') + suffix
+
+    def channels(self):
+        def handler(id, part, **params):
+            items = []
+            for channel_id in id.split(','):
+                items.append({
+                    'id': channel_id,
+                    'snippet': {'title': f"Channel {channel_id}", 'description': "Synthetic benchmark channel"},
+                    'statistics': {
+                        'subscriberCount': str(len(channel_id) * 1000),
+                        'viewCount': str(self.videos_per_channel * 5000),
+                        'videoCount': str(self.videos_per_channel),
+                    },
+                    'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}},
+                })
+            return {'items': items}
+        return FakeResource(self, 'channels', handler)
+
+    def playlists(self):
+        def handler(channelId, part, maxResults=5, pageToken=None, **params):
+            items = [
+                {
+                    'id': f"PL{channelId[2:]}{i:04d}",
+                    'snippet': {
+                        'title': f"Playlist {i}",
+                        'channelId': channelId,
+                        'channelTitle': f"Channel {channelId}",
+                        'publishedAt': self.timestamp(i * 86400),
+                    },
+                    'contentDetails': {'itemCount': i * 3},
+                }
+                for i in range(self.playlists_per_channel)
+            ]
+            return page(items, pageToken, maxResults)
+        return FakeResource(self, 'playlists', handler)
+
+    def playlistItems(self):
+        def handler(playlistId, part, maxResults=5, pageToken=None, **params):
+            channel_id = 'UC' + playlistId[2:]
+            video_ids = self.video_ids(channel_id)
+            # Uploads playlists list the newest video first
+            items = [
+                {
+                    'contentDetails': {
+                        'videoId': video_id,
+                        'videoPublishedAt': self.timestamp(self.video_number(video_id) * 3600),
+                    }
+                }
+                for video_id in reversed(video_ids)
+            ]
+            return page(items, pageToken, maxResults)
+        return FakeResource(self, 'playlistItems', handler)
+
+    def videos(self):
+        def handler(id, part, **params):
+            items = []
+            for video_id in id.split(','):
+                number = self.video_number(video_id)
+                if self.deleted_every and number % self.deleted_every == self.deleted_every - 1:
+                    continue
+                items.append({
+                    'id': video_id,
+                    'snippet': {
+                        'channelTitle': f"Channel {self.channel_of_video.get(video_id)}",
+                        'channelId': self.channel_of_video.get(video_id),
+                        'description': f"Description of video {number}. " * 4,
+                        'tags': [f"tag{number % 7}", f"topic{number % 11}", "benchmark"],
+                        'publishedAt': self.timestamp(number * 3600, fraction=number % 3 == 0),
+                        'thumbnails': {'high': {'url': f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+                    },
+                    'statistics': {
+                        'viewCount': str(number * 37 % 1000003),
+                        'likeCount': str(number * 7 % 10007),
+                        'favoriteCount': '0',
+                        'commentCount': str(self.comments_per_video),
+                    },
+                    'contentDetails': {'duration': DURATIONS[number % len(DURATIONS)], 'caption': 'false'},
+                })
+            return {'items': items}
+        return FakeResource(self, 'videos', handler)
+
+    def comment(self, comment_id, number):
+        return {
+            'authorDisplayName': f"viewer{number % 977}",
+            'publishedAt': self.timestamp(number * 60),
+            'textDisplay': f"Comment {number} on this video, with a little text to make it realistic.",
+            'likeCount': number % 50,
+            'updatedAt': self.timestamp(number * 60 + 30, fraction=number % 5 == 0),
+        }
+
+    def commentThreads(self):
+        def handler(videoId, part, maxResults=20, pageToken=None, **params):
+            number = self.video_number(videoId)
+            if self.disabled_every and number % self.disabled_every == self.disabled_every - 1:
+                raise comments_disabled_error(videoId)
+            items = []
+            for i in range(self.comments_per_video):
+                thread_id = f"{videoId}c{i:05d}"
+                items.append({
+                    'id': thread_id,
+                    'snippet': {
+                        'topLevelComment': {'snippet': self.comment(thread_id, number * 1000 + i)},
+                        'totalReplyCount': self.replies_per_comment,
+                    },
+                    # The API embeds at most five replies per thread
+                    'replies': {'comments': [
+                        {'id': f"{thread_id}r{r}", 'snippet': self.comment(thread_id, r)}
+                        for r in range(min(self.replies_per_comment, 5))
+                    ]},
+                })
+            return page(items, pageToken, maxResults)
+        return FakeResource(self, 'commentThreads', handler)
+
+    def comments(self):
+        def handler(parentId, part, maxResults=20, pageToken=None, **params):
+            items = [
+                {'id': f"{parentId}r{r}", 'snippet': self.comment(parentId, r)}
+                for r in range(self.replies_per_comment)
+            ]
+            return page(items, pageToken, maxResults)
+        return FakeResource(self, 'comments', handler)
@@ -0,0 +1,115 @@
+"""SQLite stand-in for a pymysql connection, for benchmarking the insert_* functions offline.
+
+Only the SQL the bulk writers emit is translated: %s placeholders,
+INSERT IGNORE and INSERT ... ON DUPLICATE KEY UPDATE, which becomes an SQLite
+upsert on the table's first column. Every execute/executemany is counted as a DB round trip.
+"""
+import re
+import sqlite3
+
+# The harvester tables, with the columns insert_* writes and the same primary keys
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ChannelInfo (
+    channel_Id TEXT PRIMARY KEY, channel_Name TEXT, subscription_count INTEGER, channel_views INTEGER,
+    Total_videos INTEGER, channel_description TEXT, playlist_id TEXT, row_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS PlaylistDetails (
+    Playlist_Id TEXT PRIMARY KEY, Title TEXT, Channel_Id TEXT, Channel_Name TEXT, PublishedAt TEXT,
+    Video_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS VideoInfo (
+    video_id TEXT PRIMARY KEY, channel_Name TEXT, channel_Id TEXT, video_description TEXT, tags TEXT,
+    published_At TEXT, view_count INTEGER, like_count INTEGER, dislike_count INTEGER, favorite_count INTEGER,
+    comment_count INTEGER, duration TEXT, duration_seconds INTEGER, thumbnail TEXT, caption_status TEXT,
+    row_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS CommentInfo (
+    comment_id TEXT PRIMARY KEY, video_id TEXT, channel_Id TEXT, author TEXT, comment_published_at TEXT,
+    comment_text TEXT, like_count INTEGER, viewer_rating TEXT, comment_updated_at TEXT, row_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS CommentArchive (
+    comment_id TEXT, video_id TEXT, channel_Id TEXT, author TEXT, comment_published_at TEXT, comment_text TEXT,
+    like_count INTEGER, viewer_rating TEXT, comment_updated_at TEXT, row_hash TEXT, archived_At TEXT,
+    PRIMARY KEY (channel_Id, comment_id)
+);
+CREATE TABLE IF NOT EXISTS VideoTag (
+    video_id TEXT, tag TEXT, PRIMARY KEY (video_id, tag)
+);
+CREATE TABLE IF NOT EXISTS ChannelStatsSnapshot (
+    channel_Id TEXT, captured_At TEXT, subscription_count INTEGER, channel_views INTEGER, Total_videos INTEGER,
+    PRIMARY KEY (channel_Id, captured_At)
+);
+CREATE TABLE IF NOT EXISTS VideoStatsSnapshot (
+    video_id TEXT, captured_At TEXT, view_count INTEGER, like_count INTEGER, comment_count INTEGER,
+    PRIMARY KEY (video_id, captured_At)
+);
+"""
+
+UPSERT_REGEX = re.compile(
+    r'INSERT INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES\s*\(([^)]*)\)\s*ON DUPLICATE KEY UPDATE\s*(.*)',
+    re.IGNORECASE | re.DOTALL,
+)
+VALUES_REGEX = re.compile(r'VALUES\((\w+)\)', re.IGNORECASE)
+
+
+# Function to translate the MySQL dialect used by bulk_upsert into SQLite
+def translate(sql):
+    match = UPSERT_REGEX.search(sql)
+    if match:
+        table, columns, values, updates = match.groups()
+        key_column = columns.split(',')[0].strip()
+        updates = VALUES_REGEX.sub(r'excluded.\1', updates.strip())
+        sql = f"INSERT INTO {table} ({columns}) VALUES ({values}) ON CONFLICT({key_column}) DO UPDATE SET {updates}"
+    return sql.replace('INSERT IGNORE', 'INSERT OR IGNORE').replace('%s', '?')
+
+
+class SQLiteCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.db.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+    def execute(self, sql, params=None):
+        self.connection.round_trips += 1
+        self.cursor.execute(translate(sql), tuple(params or ()))
+        return self.cursor.rowcount
+
+    def executemany(self, sql, rows):
+        # pymysql sends a whole executemany INSERT as one multi-row statement
+        self.connection.round_trips += 1
+        self.cursor.executemany(translate(sql), rows)
+        return self.cursor.rowcount
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+# A pymysql-like connection backed by SQLite (in memory unless a path is given)
+class SQLiteConnection:
+    def __init__(self, path=':memory:'):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.round_trips = 0
+
+    def cursor(self, cursor_class=None):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.db.close()
+
+    def count_rows(self, table):
+        return self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
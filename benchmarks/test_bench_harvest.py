@@ -0,0 +1,9 @@
+"""Runs the offline harvest benchmark in --check mode, so pytest catches API call and row count regressions.
+
+    python -m pytest benchmarks
+"""
+import bench_harvest
+
+
+def test_bench_harvest_check_passes():
+    assert bench_harvest.main(['--channels', '1', '--videos', '100', '--check', '--no-memory']) == 0
@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from metrics import record as record_metric
+
+# Default location of the on-disk response cache
+API_CACHE_PATH = 'youtube_api_cache.sqlite3'
+# Seconds a cached response is served without contacting the API, per endpoint
+DEFAULT_TTLS = {
+    'channels': 60 * 60,
+    'playlists': 60 * 60,
+    'playlistItems': 15 * 60,
+    'videos': 60 * 60,
+    'commentThreads': 6 * 60 * 60,
+    'comments': 6 * 60 * 60,
+}
+# Most responses kept on disk; the oldest are dropped beyond it
+API_CACHE_MAX_ROWS = 100000
+# Stores between two prunes of the cache file
+API_CACHE_PRUNE_EVERY = 1000
+
+
+# Persistent cache of YouTube API list() responses, keyed by endpoint and parameters
+class ResponseCache:
+    def __init__(self, path=API_CACHE_PATH, ttls=None, max_rows=API_CACHE_MAX_ROWS):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_rows = max_rows
+        self._stores = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        # The comment harvester runs requests from worker threads, so access is serialised
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            cache_key TEXT PRIMARY KEY,
+            etag TEXT,
+            body TEXT,
+            stored_at REAL
+        )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_stored_at ON responses (stored_at)")
+        self._db.commit()
+        with self._lock:
+            self._prune()
+
+    @staticmethod
+    def make_key(endpoint, params):
+        return f"{endpoint}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def lookup(self, key):
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, body, stored_at FROM responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+
+    def store(self, key, etag, body):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, etag, body, stored_at) VALUES (?, ?, ?, ?)",
+                (key, etag, body, time.time())
+            )
+            self._db.commit()
+            self._stores += 1
+            if self._stores % API_CACHE_PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self):
+        # Entries older than the longest TTL are stale for every endpoint; past the row cap the oldest go first.
+        # Called with the lock held.
+        cutoff = time.time() - max(self.ttls.values(), default=0)
+        self._db.execute("DELETE FROM responses WHERE stored_at < ?", (cutoff,))
+        excess = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_rows
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE cache_key IN "
+                "(SELECT cache_key FROM responses ORDER BY stored_at LIMIT ?)",
+                (excess,)
+            )
+        self._db.commit()
+
+    def touch(self, key):
+        with self._lock:
+            self._db.execute("UPDATE responses SET stored_at = ? WHERE cache_key = ?", (time.time(), key))
+            self._db.commit()
+
+    def record(self, outcome, size=0):
+        with self._lock:
+            if outcome == 'hit':
+                self.hits += 1
+            elif outcome == 'revalidated':
+                self.revalidated += 1
+            else:
+                self.misses += 1
+            self.bytes_saved += size
+        # The counters above are totals of the process; each run's own share goes to its stage metrics
+        if outcome == 'hit':
+            record_metric(cache_hits=1, cache_bytes_saved=size)
+        elif outcome == 'revalidated':
+            record_metric(cache_hits=1, cache_revalidated=1, cache_bytes_saved=size)
+        else:
+            record_metric(cache_misses=1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'bytes_saved': self.bytes_saved,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+# A list() request that is answered from the cache when possible
+class CachedRequest:
+    def __init__(self, cache, endpoint, params, request):
+        self.cache = cache
+        self.endpoint = endpoint
+        self.params = params
+        self.request = request
+
+    def execute(self, **kwargs):
+        key = ResponseCache.make_key(self.endpoint, self.params)
+        cached = self.cache.lookup(key)
+        ttl = self.cache.ttls.get(self.endpoint, 0)
+        if cached is not None:
+            etag, body, stored_at = cached
+            if time.time() - stored_at < ttl:
+                self.cache.record('hit', len(body))
+                return json.loads(body)
+            # Stale entry: ask the API whether it changed instead of downloading it again
+            headers = getattr(self.request, 'headers', None)
+            if etag and headers is not None:
+                headers['If-None-Match'] = etag
+        try:
+            response = self.request.execute(**kwargs)
+        except HttpError as e:
+            if cached is not None and e.resp.status == 304:
+                self.cache.touch(key)
+                self.cache.record('revalidated', len(cached[1]))
+                return json.loads(cached[1])
+            raise
+        body = json.dumps(response)
+        self.cache.store(key, response.get('etag'), body)
+        self.cache.record('miss')
+        return response
+
+
+# A resource collection (videos(), channels(), ...) whose list() calls go through the cache
+class CachedResource:
+    def __init__(self, cache, endpoint, resource):
+        self.cache = cache
+        self.endpoint = endpoint
+        self.resource = resource
+
+    def list(self, **params):
+        return CachedRequest(self.cache, self.endpoint, params, self.resource.list(**params))
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
+
+# Drop-in wrapper around build('youtube', 'v3') that caches list() responses on disk
+class CachedYouTube:
+    def __init__(self, youtube, cache=None):
+        self.youtube = youtube
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.youtube, name)
+        if name in self.cache.ttls:
+            return lambda: CachedResource(self.cache, name, attribute())
+        return attribute
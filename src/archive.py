@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+
+import pymysql
+
+from metrics import record
+
+# Columns shared by CommentInfo and CommentArchive, in table order
+COMMENT_ARCHIVE_COLUMNS = ['comment_id', 'video_id', 'channel_Id', 'author', 'comment_published_at', 'comment_text',
+                           'like_count', 'viewer_rating', 'comment_updated_at', 'row_hash']
+# Hash partitions of the archive; a channel's archived comments always live in exactly one of them
+ARCHIVE_PARTITIONS = 16
+# Comments moved per transaction
+ARCHIVE_CHUNK_SIZE = 1000
+
+
+# Function to create the compressed comment archive and the CommentAll view over live and archived comments
+def create_comment_archive(cursor):
+    # Partitioned by a hash of the channel, so per-channel reads and deletes open a single partition.
+    # Archived rows are written once and rarely read, which suits compressed pages.
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS CommentArchive (
+        comment_id VARCHAR(255) NOT NULL,
+        video_id VARCHAR(255),
+        channel_Id VARCHAR(255) NOT NULL,
+        author VARCHAR(255),
+        comment_published_at DATETIME,
+        comment_text TEXT,
+        like_count BIGINT,
+        viewer_rating VARCHAR(255),
+        comment_updated_at DATETIME,
+        row_hash CHAR(32),
+        archived_At DATETIME,
+        PRIMARY KEY (channel_Id, comment_id),
+        INDEX idx_archive_video (video_id)
+    )
+    ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8
+    PARTITION BY KEY (channel_Id) PARTITIONS {ARCHIVE_PARTITIONS}
+    """)
+    # A comment is in exactly one of the two tables, so UNION ALL never returns it twice
+    columns = ', '.join(COMMENT_ARCHIVE_COLUMNS)
+    cursor.execute(f"""
+    CREATE OR REPLACE VIEW CommentAll AS
+    SELECT {columns}, FALSE AS archived FROM CommentInfo
+    UNION ALL
+    SELECT {columns}, TRUE AS archived FROM CommentArchive
+    """)
+
+
+# Function to move a channel's comments published more than `days` days ago from CommentInfo into
+# CommentArchive, one transaction per chunk; returns the number of comments moved
+def archive_comments(conn, channel_id, days, chunk_size=ARCHIVE_CHUNK_SIZE):
+    cutoff = (datetime.now() - timedelta(days=days)).replace(microsecond=0)
+    columns = ', '.join(COMMENT_ARCHIVE_COLUMNS)
+    archived = 0
+    while True:
+        try:
+            with conn.cursor() as cursor:
+                # Reads the channel's range of the clustered key through idx_comment_channel_published
+                cursor.execute("""
+                SELECT comment_id FROM CommentInfo
+                WHERE channel_Id = %s AND comment_published_at < %s
+                LIMIT %s
+                """, (channel_id, cutoff, chunk_size))
+                comment_ids = [row[0] for row in cursor.fetchall()]
+                if not comment_ids:
+                    record(db_round_trips=1)
+                    break
+                placeholders = ', '.join(['%s'] * len(comment_ids))
+                # A re-harvested archived comment is updated in the archive, so it never sits in both tables
+                cursor.execute(f"""
+                REPLACE INTO CommentArchive ({columns}, archived_At)
+                SELECT {columns}, NOW() FROM CommentInfo WHERE channel_Id = %s AND comment_id IN ({placeholders})
+                """, (channel_id, *comment_ids))
+                cursor.execute(
+                    f"DELETE FROM CommentInfo WHERE channel_Id = %s AND comment_id IN ({placeholders})",
+                    (channel_id, *comment_ids)
+                )
+            conn.commit()
+        except pymysql.MySQLError:
+            conn.rollback()
+            raise
+        archived += len(comment_ids)
+        record(db_round_trips=3, rows_archived=len(comment_ids))
+    return archived
+
+
+# Function to read the row hashes of archived comments among rows laid out as `columns`, keyed by comment ID;
+# each channel's lookup reads a single partition
+def archived_hashes(conn, columns, rows):
+    channel_index = columns.index('channel_Id')
+    comment_ids = {}
+    for row in rows:
+        comment_ids.setdefault(row[channel_index], []).append(row[0])
+    hashes = {}
+    with conn.cursor() as cursor:
+        for channel_id, ids in comment_ids.items():
+            cursor.execute(
+                f"SELECT comment_id, row_hash FROM CommentArchive "
+                f"WHERE channel_Id = %s AND comment_id IN ({', '.join(['%s'] * len(ids))})",
+                (channel_id, *ids)
+            )
+            hashes.update(cursor.fetchall())
+    record(db_round_trips=len(comment_ids))
+    return hashes
+
+
+# Function to update archived comments in place with their re-harvested values, without committing; rows are
+# laid out as `columns` followed by the row hash. An archived comment stays archived until the policy changes.
+def update_archived_comments(conn, columns, rows):
+    values = [column for column in (*columns, 'row_hash') if column not in ('comment_id', 'channel_Id')]
+    channel_index = columns.index('channel_Id')
+    positions = [(*columns, 'row_hash').index(column) for column in values]
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE CommentArchive SET {', '.join(f'{column} = %s' for column in values)} "
+            f"WHERE channel_Id = %s AND comment_id = %s",
+            [(*(row[i] for i in positions), row[channel_index], row[0]) for row in rows]
+        )
+    record(db_round_trips=1)
+
+
+# Function to read a channel's stored comment retention in days; returns None if it has no policy
+def get_retention_days(conn, channel_id):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT archive_days FROM CommentRetention WHERE channel_Id = %s", (channel_id,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# Function to store a channel's comment retention in days, so every later harvest applies it whoever starts it;
+# 0 removes the policy
+def save_retention_days(conn, channel_id, days):
+    try:
+        with conn.cursor() as cursor:
+            if days:
+                cursor.execute("""
+                INSERT INTO CommentRetention (channel_Id, archive_days, updated_At) VALUES (%s, %s, NOW())
+                ON DUPLICATE KEY UPDATE archive_days = VALUES(archive_days), updated_At = VALUES(updated_At)
+                """, (channel_id, days))
+            else:
+                cursor.execute("DELETE FROM CommentRetention WHERE channel_Id = %s", (channel_id,))
+        conn.commit()
+    except pymysql.MySQLError:
+        conn.rollback()
+        raise
@@ -0,0 +1,83 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Videos drawn individually in the top-N chart; the rest are summed into one "other" bar
+CHART_TOP_N = 20
+# Most time bins the publish-date chart draws; the bin width grows with the channel's age instead
+CHART_MAX_BINS = 24
+# Candidate bin widths for the publish-date chart, narrowest first: (pandas period, approximate days)
+TIME_BIN_PERIODS = [('D', 1), ('W', 7), ('M', 30.44), ('Q', 91.31), ('Y', 365.25)]
+# Counters drawn per bar group: (column, legend label)
+VIDEO_CHART_SERIES = [('view_count', 'Views'), ('like_count', 'Likes'), ('comment_count', 'Comments')]
+VIDEO_CHART_COLUMNS = [column for column, _ in VIDEO_CHART_SERIES]
+# Chart modes offered for the videos of a channel
+VIDEO_CHART_MODES = ("Top videos", "By publish date")
+
+
+# Function to keep the n most viewed videos and sum every other video into one "other" row
+def top_videos(df, n=CHART_TOP_N):
+    counters = df[VIDEO_CHART_COLUMNS].fillna(0)
+    if len(df) <= n:
+        return pd.DataFrame(counters.to_numpy(), index=df['video_id'], columns=VIDEO_CHART_COLUMNS)
+    # argpartition finds the top n in linear time; only those n are sorted
+    views = counters['view_count'].to_numpy()
+    top = np.argpartition(-views, n - 1)[:n]
+    top = top[np.argsort(-views[top], kind='stable')]
+    rest = np.ones(len(df), dtype=bool)
+    rest[top] = False
+    data = pd.DataFrame(counters.to_numpy()[top], index=df['video_id'].to_numpy()[top], columns=VIDEO_CHART_COLUMNS)
+    data.loc[f"other ({rest.sum()} videos)"] = counters.to_numpy()[rest].sum(axis=0)
+    return data
+
+
+# Function to sum the counters of the videos published in each time bin, picking the narrowest bin width
+# that needs no more than max_bins bins
+def time_bins(df, max_bins=CHART_MAX_BINS):
+    published = pd.to_datetime(df['published_At'], errors='coerce')
+    counters = df[VIDEO_CHART_COLUMNS].fillna(0)[published.notna()]
+    published = published.dropna()
+    if published.empty:
+        return pd.DataFrame(columns=VIDEO_CHART_COLUMNS)
+    span_days = (published.max() - published.min()).days + 1
+    period = next((period for period, days in TIME_BIN_PERIODS if span_days / days <= max_bins), 'Y')
+    data = counters.groupby(published.dt.to_period(period)).sum().sort_index()
+    data.index = data.index.astype(str)
+    return data
+
+
+# Function to draw the counters of each row of `data` as grouped bars; returns the chart as PNG bytes
+def render_bar_chart(data, title, xlabel, rotation=45):
+    # matplotlib takes most of a cold start, so it is only imported once a chart is drawn
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    positions = np.arange(len(data))
+    bar_width = 0.8 / len(VIDEO_CHART_SERIES)
+    for offset, (column, label) in enumerate(VIDEO_CHART_SERIES):
+        ax.bar(positions + offset * bar_width, data[column].to_numpy(), bar_width, label=label)
+    # Views, likes, comments and the summed "other" bar span several orders of magnitude
+    ax.set_yscale('log')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Counts (log scale)')
+    ax.set_title(title)
+    ax.set_xticks(positions + bar_width)
+    ax.set_xticklabels(data.index, rotation=rotation, ha='right')
+    ax.legend()
+    fig.tight_layout()
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    # pyplot keeps every open figure alive until it is closed
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Function to render the video chart of a channel in one of VIDEO_CHART_MODES; the number of bars is bounded,
+# so the drawing time does not grow with the number of videos
+def render_video_chart(df, mode):
+    if mode == "By publish date":
+        return render_bar_chart(time_bins(df), 'Video Information by Publish Date', 'Published')
+    return render_bar_chart(top_videos(df), f'Top {CHART_TOP_N} Videos by Views', 'Video')
@@ -0,0 +1,183 @@
+"""Headless batch harvester.
+
+Usage:
+    python src/harvest_cli.py channels.txt --workers 8
+
+channels.txt holds one channel ID per line; blank lines and lines starting
+with '#' are ignored, and '-' reads the list from stdin. The API key and DB
+password default to the YOUTUBE_API_KEY and MYSQL_PASSWORD environment
+variables.
+
+    python src/harvest_cli.py --rebuild-summary
+
+checks the ChannelSummary aggregates against VideoInfo and rebuilds them.
+
+    python src/harvest_cli.py channels.txt --archive-days 365
+    python src/harvest_cli.py --archive-days 365
+
+sets and applies the comment retention policy: comments published more than
+that many days ago move from CommentInfo into the compressed, partitioned
+CommentArchive, after each harvested channel or, without a channels file,
+for every stored channel. The policy is stored per channel, so every later
+harvest of the channel applies it, including jobs started from the app;
+--archive-days 0 removes it. Archived comments stay queryable through the
+CommentAll view.
+
+Every harvested channel appends its per-stage timings and counters to
+harvest_metrics.jsonl and rewrites harvest_metrics.prom, a Prometheus text
+file with the latest run per channel for the node_exporter textfile collector.
+A harvest stopped by a crash or the daily quota is checkpointed in MySQL;
+running the same command again resumes it instead of starting over.
+With --warehouse, each harvested channel is also synced into the Parquet
+warehouse (see warehouse.py).
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from archive import save_retention_days
+from harvester import (
+    REFRESH_WINDOW_DAYS,
+    archive_all_comments,
+    create_tables,
+    db_connection,
+    get_quota_scheduler,
+    rebuild_channel_summary,
+    run_harvest,
+    youtube_client,
+)
+from metrics import METRICS_JSONL_PATH, METRICS_PROM_PATH, RunMetrics, export_run
+from warehouse import sync_channel
+
+logger = logging.getLogger('harvest_cli')
+
+
+# Function to read channel IDs from a file (or stdin for '-')
+def read_channel_ids(path):
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        channel_ids = []
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#') and line not in channel_ids:
+                channel_ids.append(line)
+        return channel_ids
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+# Function to harvest one channel; failures are returned, never raised, so one channel cannot stop the batch
+def harvest_channel(channel_id, args):
+    start = time.perf_counter()
+    try:
+        youtube = youtube_client(args.api_key)
+        with db_connection(args.db_user, args.db_password) as conn:
+            if conn is None:
+                return channel_id, None, time.perf_counter() - start, 'could not connect to MySQL'
+            if args.archive_days is not None:
+                save_retention_days(conn, channel_id, args.archive_days)
+            run = RunMetrics(channel_id, 'full' if args.full else 'incremental')
+            rows_written = run_harvest(youtube, conn, channel_id, args.full, args.include_replies, run,
+                                       args.archive_days or None)
+            export_run(run, args.metrics_jsonl, args.metrics_prom)
+        if rows_written is None:
+            return channel_id, None, time.perf_counter() - start, 'migration failed (see log)'
+        if args.warehouse and sync_channel(args.db_user, args.db_password, channel_id, full=args.full) is None:
+            return channel_id, rows_written, time.perf_counter() - start, 'Parquet warehouse sync failed (see log)'
+        return channel_id, rows_written, time.perf_counter() - start, None
+    except Exception as e:
+        return channel_id, None, time.perf_counter() - start, str(e)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest many YouTube channels into MySQL in parallel.")
+    parser.add_argument('channels', nargs='?', help="file with one channel ID per line, or '-' for stdin")
+    parser.add_argument('--workers', type=int, default=4, help="channels harvested in parallel (default: 4)")
+    parser.add_argument('--full', action='store_true', help="clear and fully re-harvest instead of incremental")
+    parser.add_argument('--include-replies', action='store_true', help="also harvest comment replies")
+    parser.add_argument('--warehouse', action='store_true',
+                        help="sync each harvested channel into the Parquet warehouse")
+    parser.add_argument('--rebuild-summary', action='store_true',
+                        help="check ChannelSummary against the base tables and rebuild it")
+    parser.add_argument('--archive-days', type=int,
+                        help="archive comments published more than this many days ago into CommentArchive, "
+                             "and keep doing so on every later harvest of the channels; 0 removes the policy")
+    parser.add_argument('--metrics-jsonl', default=METRICS_JSONL_PATH,
+                        help=f"append per-run metrics as JSON lines here (default: {METRICS_JSONL_PATH})")
+    parser.add_argument('--metrics-prom', default=METRICS_PROM_PATH,
+                        help=f"Prometheus text file with the latest run per channel (default: {METRICS_PROM_PATH})")
+    parser.add_argument('--api-key', default=os.environ.get('YOUTUBE_API_KEY'))
+    parser.add_argument('--db-user', default=os.environ.get('MYSQL_USER', 'root'))
+    parser.add_argument('--db-password', default=os.environ.get('MYSQL_PASSWORD', ''))
+    args = parser.parse_args(argv)
+    if not args.channels and not args.rebuild_summary and args.archive_days is None:
+        parser.error("a channels file is required unless --rebuild-summary or --archive-days is given")
+    if args.channels and not args.api_key:
+        parser.error("an API key is required (--api-key or YOUTUBE_API_KEY)")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    # Incremental harvests refetch the comments of recent videos; archiving those would move them back and forth
+    if args.archive_days is not None and args.archive_days != 0 and args.archive_days < REFRESH_WINDOW_DAYS:
+        parser.error(f"--archive-days must be 0 or at least {REFRESH_WINDOW_DAYS}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+    with db_connection(args.db_user, args.db_password) as conn:
+        if conn is None:
+            return 1
+        create_tables(conn)
+        if args.rebuild_summary:
+            stale = rebuild_channel_summary(conn)
+            if stale is None:
+                return 1
+            print(f"ChannelSummary rebuilt; {stale} channel(s) were out of date")
+        if args.archive_days is not None and not args.channels:
+            archived = archive_all_comments(conn, args.archive_days)
+            if archived is None:
+                return 1
+            if args.archive_days:
+                print(f"Archived {archived} comment(s) older than {args.archive_days} days")
+            else:
+                print("Removed the comment retention policy of every stored channel")
+    if not args.channels:
+        return 0
+    channel_ids = read_channel_ids(args.channels)
+    if not channel_ids:
+        logger.error("No channel IDs to harvest")
+        return 1
+
+    start = time.perf_counter()
+    failures = []
+    total_rows = 0
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='harvest') as executor:
+        futures = [executor.submit(harvest_channel, channel_id, args) for channel_id in channel_ids]
+        for future in as_completed(futures):
+            channel_id, rows_written, elapsed, error = future.result()
+            if error:
+                failures.append((channel_id, error))
+                logger.error(f"{channel_id}: failed after {elapsed:.1f}s: {error}")
+            else:
+                rows = sum(rows_written.values())
+                total_rows += rows
+                logger.info(f"{channel_id}: {rows} rows in {elapsed:.1f}s")
+    elapsed = time.perf_counter() - start
+
+    succeeded = len(channel_ids) - len(failures)
+    quota_stats = get_quota_scheduler(args.api_key).stats()
+    print(f"Harvested {succeeded}/{len(channel_ids)} channels in {elapsed:.1f}s "
+          f"({succeeded / elapsed * 60:.1f} channels/min, {total_rows / elapsed:,.0f} rows/s)")
+    print(f"Quota used today: {quota_stats['used']} units, {quota_stats['retries']} retries")
+    for channel_id, error in failures:
+        print(f"FAILED {channel_id}: {error}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1472 @@
+import hashlib
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+import pandas as pd
+import pyarrow as pa
+import pymysql
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+from api_cache import CachedYouTube, ResponseCache
+from archive import (
+    archive_comments,
+    archived_hashes,
+    create_comment_archive,
+    get_retention_days,
+    save_retention_days,
+    update_archived_comments,
+)
+from metrics import MeteredYouTube, RunMetrics, record
+from quota import QuotaExceededError, QuotaScheduler, ScheduledYouTube
+from snapshots import (
+    SNAPSHOTS,
+    add_snapshot_partitions,
+    changed_counters,
+    create_snapshot_tables,
+    latest_snapshots,
+    write_snapshots,
+)
+from transform import (
+    COMMENT_BATCH_SCHEMA,
+    VIDEO_BATCH_SCHEMA,
+    duration_to_seconds,
+    format_seconds,
+    rebatch,
+    to_record_batch,
+    transform_comments,
+    transform_playlists,
+    transform_videos,
+)
+
+logger = logging.getLogger(__name__)
+
+def parse_iso_date(date_str):
+    """Parses ISO 8601 date strings with or without fractional seconds."""
+    try:
+        # Try processing with fractional seconds first
+        return datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S.%fZ').strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        try:
+            # Fallback to standard format
+            return datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ').strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+             # Return original string or handle failure as needed if both fail (though unlikely for this API)
+             return date_str
+
+# Function to establish MySQL connection
+def mysql_connection(user, password):
+
+    try:
+        connection = pymysql.connect(
+            host='localhost',
+            user=user,
+            password=password,
+            db='bharath',
+            charset='utf8mb4',
+
+        )
+        return connection
+    except pymysql.MySQLError as e:
+        logger.error(f"Error connecting to MySQL:{e}")
+        return None
+# Maximum number of idle connections each pool keeps open
+POOL_MAX_IDLE = 5
+# Pool of reusable MySQL connections for one set of credentials
+class ConnectionPool:
+    def __init__(self, user, password, max_idle=POOL_MAX_IDLE):
+        self.user = user
+        self.password = password
+        self.max_idle = max_idle
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return mysql_connection(self.user, self.password)
+            # Health-check on checkout; drop connections the server has closed
+            try:
+                conn.ping(reconnect=False)
+                return conn
+            except Exception:
+                self._discard(conn)
+
+    def release(self, conn):
+        try:
+            # End any open transaction so the next user does not read a stale snapshot
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        if conn is None:
+            yield None
+            return
+        try:
+            yield conn
+        except Exception:
+            # The connection may be mid-transaction or broken, so do not reuse it
+            self._discard(conn)
+            raise
+        else:
+            self.release(conn)
+_shared = {}
+# Re-entrant, because factories may themselves ask for shared instances (a job runner needs its pool)
+_shared_lock = threading.RLock()
+# Function to create an object once per process and share it between threads, sessions and reruns
+def shared_instance(key, factory):
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = factory()
+        return _shared[key]
+# One pool per set of credentials
+def get_connection_pool(user, password):
+    return shared_instance(('pool', user, password), lambda: ConnectionPool(user, password))
+# On-disk API response cache
+def get_response_cache():
+    return shared_instance(('response_cache',), ResponseCache)
+# Quota scheduler per API key, so the daily budget is tracked across runs
+def get_quota_scheduler(api_key):
+    return shared_instance(('quota', api_key), QuotaScheduler)
+# Function to get the YouTube client of an API key, whose requests are cached and quota-scheduled.
+# It is built once per key from the discovery document bundled with the library and shared by every
+# rerun, session and job; requests go out on the Http object of the calling thread.
+def youtube_client(api_key):
+    scheduler = get_quota_scheduler(api_key)
+    response_cache = get_response_cache()
+
+    def build_client():
+        youtube = build('youtube', 'v3', developerKey=api_key, http=ThreadLocalHttp(), static_discovery=True)
+        return CachedYouTube(ScheduledYouTube(youtube, scheduler), response_cache)
+    return shared_instance(('youtube', api_key), build_client)
+# Function to check out a pooled MySQL connection; yields None if connecting failed
+def db_connection(user, password):
+    return get_connection_pool(user, password).connection()
+# Function to create SQL tables
+def create_tables(conn):
+
+    try:
+        with conn.cursor() as cursor:
+            # Create a table for channel info
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ChannelInfo (
+                channel_Id VARCHAR(255) PRIMARY KEY,
+                channel_Name VARCHAR(255),
+                subscription_count INT,
+                channel_views INT,
+                Total_videos INT,
+                channel_description TEXT,
+                playlist_id VARCHAR(255)
+            )
+            """)
+            # Create a table for playlist details
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS PlaylistDetails (
+                Playlist_Id VARCHAR(255) PRIMARY KEY,
+                Title VARCHAR(255),
+                Channel_Id VARCHAR(255),
+                Channel_Name VARCHAR(255),
+                PublishedAt DATETIME,
+                Video_count INT
+            )
+            """)
+            # Create a table for video info
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS VideoInfo (
+                video_id VARCHAR(255) PRIMARY KEY,
+                channel_Name VARCHAR(255),
+                channel_Id VARCHAR(255),
+                video_description TEXT,
+                tags TEXT,
+                published_At DATETIME,
+                view_count INT,
+                like_count INT,
+                dislike_count INT,
+                favorite_count INT,
+                comment_count INT,
+                duration VARCHAR(255),
+                thumbnail VARCHAR(255),
+                caption_status VARCHAR(255)
+            )
+            """)
+            # Create a table for comment info
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS CommentInfo (
+                comment_id VARCHAR(255) PRIMARY KEY,
+                video_id VARCHAR(255),
+                author VARCHAR(255),
+                comment_published_at DATETIME,
+                comment_text TEXT,
+                like_count INT,
+                viewer_rating VARCHAR(255),
+                comment_updated_at DATETIME
+            )
+            """)
+            # Create a table for the per-channel incremental harvest high-water mark
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS HarvestState (
+                channel_Id VARCHAR(255) PRIMARY KEY,
+                last_video_id VARCHAR(255),
+                last_published_At DATETIME,
+                last_harvested_At DATETIME
+            )
+            """)
+        conn.commit()
+        migrate_schema(conn)
+        # Once per process start rather than per harvest, so parallel workers never race on the ALTER
+        ensure_snapshot_partitions(conn)
+    except pymysql.MySQLError as e:
+        logger.error(f"Error creating tables: {e}")
+# Schema version created by create_tables; later versions are applied by migrate_schema
+BASE_SCHEMA_VERSION = 1
+# Function to check whether an index already exists, so migrations can be re-run safely
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return cursor.fetchone()[0] > 0
+# Function to get the columns of a table's primary key, in key order
+def primary_key_columns(cursor, table):
+    cursor.execute("""
+    SELECT column_name FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = 'PRIMARY'
+    ORDER BY seq_in_index
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+# Function to add an index (or a FULLTEXT INDEX) unless it already exists
+def add_index(cursor, table, index_name, columns, kind='INDEX'):
+    if not index_exists(cursor, table, index_name):
+        cursor.execute(f"ALTER TABLE {table} ADD {kind} {index_name} ({columns})")
+# Function to change a column's type unless it already has it (MODIFY rebuilds the whole table)
+def modify_column(cursor, table, column, definition):
+    cursor.execute("""
+    SELECT COLUMN_TYPE FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    if row is not None and row[0].split('(')[0].lower() != definition.split('(')[0].lower():
+        cursor.execute(f"ALTER TABLE {table} MODIFY COLUMN {column} {definition}")
+# Version 2: indexes for the analytical queries and BIGINT counters
+def schema_v2(cursor):
+    add_index(cursor, 'VideoInfo', 'idx_video_channel_published', 'channel_Id, published_At')
+    add_index(cursor, 'VideoInfo', 'idx_video_view_count', 'view_count')
+    add_index(cursor, 'VideoInfo', 'idx_video_like_count', 'like_count')
+    add_index(cursor, 'VideoInfo', 'idx_video_comment_count', 'comment_count')
+    add_index(cursor, 'CommentInfo', 'idx_comment_video', 'video_id')
+    for table, columns in [
+        ('ChannelInfo', ['subscription_count', 'channel_views', 'Total_videos']),
+        ('PlaylistDetails', ['Video_count']),
+        ('VideoInfo', ['view_count', 'like_count', 'dislike_count', 'favorite_count', 'comment_count']),
+        ('CommentInfo', ['like_count']),
+    ]:
+        for column in columns:
+            modify_column(cursor, table, column, 'BIGINT')
+# Version 3: per-channel aggregates maintained by every migration
+def schema_v3(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ChannelSummary (
+        channel_Id VARCHAR(255) PRIMARY KEY,
+        channel_Name VARCHAR(255),
+        video_count BIGINT,
+        total_views BIGINT,
+        total_likes BIGINT,
+        total_comments BIGINT,
+        avg_duration_seconds DOUBLE,
+        updated_At DATETIME
+    )
+    """)
+    # Kept as shipped: duration_seconds only exists from version 4, which rebuilds the summary from it
+    cursor.execute("""
+    INSERT INTO ChannelSummary
+    SELECT channel_Id, MAX(channel_Name) AS channel_Name, COUNT(*) AS video_count,
+    COALESCE(SUM(view_count), 0) AS total_views, COALESCE(SUM(like_count), 0) AS total_likes,
+    COALESCE(SUM(comment_count), 0) AS total_comments,
+    COALESCE(AVG(TIME_TO_SEC(duration)), 0) AS avg_duration_seconds, NOW() AS updated_At
+    FROM VideoInfo GROUP BY channel_Id
+    """)
+# Function to add a column unless it already exists
+def add_column(cursor, table, column, definition):
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+# Version 4: integer duration_seconds, so aggregates no longer parse the duration string per row
+def schema_v4(cursor):
+    add_column(cursor, 'VideoInfo', 'duration_seconds', 'BIGINT AFTER duration')
+    # duration is a VARCHAR holding HH:MM:SS, which TIME_TO_SEC parses
+    cursor.execute("UPDATE VideoInfo SET duration_seconds = TIME_TO_SEC(duration) WHERE duration_seconds IS NULL")
+    # (Re)build the summary now that it can read duration_seconds
+    cursor.execute("DELETE FROM ChannelSummary")
+    cursor.execute(f"INSERT INTO ChannelSummary {CHANNEL_SUMMARY_SELECT} GROUP BY channel_Id")
+# Version 5: per-stage checkpoints so an interrupted harvest can resume
+def schema_v5(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS HarvestCheckpoint (
+        channel_Id VARCHAR(255),
+        stage VARCHAR(32),
+        page_token VARCHAR(255),
+        completed BOOLEAN NOT NULL DEFAULT FALSE,
+        updated_At DATETIME,
+        PRIMARY KEY (channel_Id, stage)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS HarvestCheckpointVideo (
+        channel_Id VARCHAR(255),
+        stage VARCHAR(32),
+        video_id VARCHAR(255),
+        PRIMARY KEY (channel_Id, stage, video_id)
+    )
+    """)
+# Version 6: background harvest jobs and their progress
+def schema_v6(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS HarvestJob (
+        job_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        channel_Id VARCHAR(255),
+        mode VARCHAR(16),
+        status VARCHAR(16),
+        rows_written BIGINT,
+        progress TEXT,
+        error TEXT,
+        created_At DATETIME,
+        started_At DATETIME,
+        finished_At DATETIME,
+        INDEX idx_job_status (status)
+    )
+    """)
+# Version 7: content hashes to skip unchanged rows, and the append-only counter history
+def schema_v7(cursor):
+    for table in ['ChannelInfo', 'VideoInfo', 'CommentInfo']:
+        add_column(cursor, table, 'row_hash', 'CHAR(32)')
+    create_snapshot_tables(cursor)
+    add_snapshot_partitions(cursor)
+    # The counters stored so far become the first snapshot, the baseline for growth queries
+    for table, (snapshot_table, key_column, counters) in SNAPSHOTS.items():
+        cursor.execute(f"""
+        INSERT IGNORE INTO {snapshot_table} ({key_column}, captured_At, {', '.join(counters)})
+        SELECT {key_column}, NOW(), {', '.join(counters)} FROM {table}
+        """)
+# Version 8: full-text search over comments and videos, and one row per video tag
+def schema_v8(cursor):
+    # The first FULLTEXT index of a table rebuilds it, once
+    add_index(cursor, 'CommentInfo', 'ft_comment_text', 'comment_text', kind='FULLTEXT INDEX')
+    add_index(cursor, 'VideoInfo', 'ft_video_text', 'video_description, tags', kind='FULLTEXT INDEX')
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS VideoTag (
+        video_id VARCHAR(255),
+        tag VARCHAR(255),
+        PRIMARY KEY (video_id, tag),
+        INDEX idx_tag_video (tag, video_id)
+    )
+    """)
+    cursor.execute("SELECT video_id, tags FROM VideoInfo WHERE tags IS NOT NULL AND tags <> ''")
+    tag_rows = [(video_id, tag) for video_id, tags in cursor.fetchall() for tag in split_tags(tags)]
+    for chunk in chunked(tag_rows, BULK_CHUNK_SIZE):
+        cursor.executemany("INSERT IGNORE INTO VideoTag (video_id, tag) VALUES (%s, %s)", chunk)
+# Version 9: comments clustered by channel, and the compressed archive of cold comments
+def schema_v9(cursor):
+    add_column(cursor, 'CommentInfo', 'channel_Id', "VARCHAR(255) NOT NULL DEFAULT '' AFTER video_id")
+    # Comments of videos that are no longer stored keep an empty channel
+    cursor.execute("""
+    UPDATE CommentInfo JOIN VideoInfo ON VideoInfo.video_id = CommentInfo.video_id
+    SET CommentInfo.channel_Id = VideoInfo.channel_Id
+    WHERE CommentInfo.channel_Id = '' AND VideoInfo.channel_Id IS NOT NULL
+    """)
+    # InnoDB cannot partition a table with a FULLTEXT index, so the live table is instead clustered by
+    # channel: a channel's comments form one range of the primary key. One rebuild, on first upgrade.
+    if primary_key_columns(cursor, 'CommentInfo') != ['channel_Id', 'comment_id']:
+        cursor.execute("""
+        ALTER TABLE CommentInfo
+        ADD UNIQUE KEY uq_comment_id (comment_id),
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (channel_Id, comment_id)
+        """)
+    add_index(cursor, 'CommentInfo', 'idx_comment_channel_published', 'channel_Id, comment_published_at')
+    create_comment_archive(cursor)
+# Version 10: the owner and heartbeat of each harvest job, so a job runner only fails the jobs of runners that died
+def schema_v10(cursor):
+    add_column(cursor, 'HarvestJob', 'owner', 'VARCHAR(128)')
+    add_column(cursor, 'HarvestJob', 'heartbeat_At', 'DATETIME')
+# Version 11: a data version shared by every process, so caches notice harvests made by other processes
+def schema_v11(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS DataVersion (
+        id TINYINT PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+    """)
+    cursor.execute("INSERT IGNORE INTO DataVersion (id, version) VALUES (1, 0)")
+# Version 12: the comment retention policy of each channel, so every harvest of it applies the policy
+def schema_v12(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS CommentRetention (
+        channel_Id VARCHAR(255) PRIMARY KEY,
+        archive_days INT NOT NULL,
+        updated_At DATETIME
+    )
+    """)
+# Ordered schema migrations: (version, function applying it)
+SCHEMA_MIGRATIONS = [
+    (2, schema_v2),
+    (3, schema_v3),
+    (4, schema_v4),
+    (5, schema_v5),
+    (6, schema_v6),
+    (7, schema_v7),
+    (8, schema_v8),
+    (9, schema_v9),
+    (10, schema_v10),
+    (11, schema_v11),
+    (12, schema_v12),
+]
+# Function to bring an existing database up to the latest schema version
+def migrate_schema(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaVersion (
+            version INT PRIMARY KEY,
+            applied_At DATETIME
+        )
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), %s) FROM SchemaVersion", (BASE_SCHEMA_VERSION,))
+        current_version = cursor.fetchone()[0]
+        for version, migration in SCHEMA_MIGRATIONS:
+            if version <= current_version:
+                continue
+            # DDL commits implicitly in MySQL, so every step checks before it changes anything
+            migration(cursor)
+            cursor.execute("INSERT INTO SchemaVersion (version, applied_At) VALUES (%s, NOW())", (version,))
+            conn.commit()
+            logger.info(f"Applied schema migration to version {version}")
+            current_version = version
+    return current_version
+def clear_existing_data(conn, channel_id):
+
+    try:
+        with conn.cursor() as cursor:
+            # Deleting from CommentInfo first due to foreign key dependency on VideoInfo; it is keyed by channel
+            # first, so only the channel's own range is touched. CommentArchive keeps the channel's history.
+            cursor.execute("DELETE FROM CommentInfo WHERE channel_Id = %s", (channel_id,))
+            cursor.execute("DELETE FROM VideoTag WHERE video_id IN (SELECT video_id FROM VideoInfo WHERE channel_Id = %s)", (channel_id,))
+            # Deleting from VideoInfo next
+            cursor.execute("DELETE FROM VideoInfo WHERE channel_Id = %s", (channel_id,))
+            # Deleting from PlaylistDetails next
+            cursor.execute("DELETE FROM PlaylistDetails WHERE channel_Id = %s", (channel_id,))
+            # Deleting from ChannelInfo last
+            cursor.execute("DELETE FROM ChannelInfo WHERE channel_Id = %s", (channel_id,))
+            # Forget the high-water mark so the next incremental run starts from scratch
+            cursor.execute("DELETE FROM HarvestState WHERE channel_Id = %s", (channel_id,))
+            cursor.execute("DELETE FROM ChannelSummary WHERE channel_Id = %s", (channel_id,))
+        conn.commit()
+        # The data an interrupted harvest would resume from is gone
+        clear_checkpoint(conn, channel_id)
+        bump_data_version(conn)
+    except pymysql.MySQLError as e:
+        logger.error(f"Error clearing existing data from MySQL: {e}")
+# Aggregates stored in ChannelSummary, computed from VideoInfo
+CHANNEL_SUMMARY_SELECT = """
+SELECT channel_Id, MAX(channel_Name) AS channel_Name, COUNT(*) AS video_count,
+COALESCE(SUM(view_count), 0) AS total_views, COALESCE(SUM(like_count), 0) AS total_likes,
+COALESCE(SUM(comment_count), 0) AS total_comments,
+COALESCE(AVG(duration_seconds), 0) AS avg_duration_seconds, NOW() AS updated_At
+FROM VideoInfo
+"""
+# MySQL error raised when a partition being added already exists
+DUPLICATE_PARTITION_ERROR = 1517
+# Function to make sure the snapshot tables have partitions for this month and the next ones. A named lock
+# serializes the check and the ALTER across processes; a partition another process added meanwhile counts as done.
+def ensure_snapshot_partitions(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK('snapshot_partitions', 30)")
+        try:
+            add_snapshot_partitions(cursor)
+        except pymysql.MySQLError as e:
+            if e.args[0] != DUPLICATE_PARTITION_ERROR:
+                raise
+            # The lock timed out and another process added the partition; the re-check skips what exists
+            add_snapshot_partitions(cursor)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('snapshot_partitions')")
+    record(db_round_trips=len(SNAPSHOTS) + 2)
+# Function to recompute one channel's summary row in a single transaction
+def refresh_channel_summary(conn, channel_id):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM ChannelSummary WHERE channel_Id = %s", (channel_id,))
+            cursor.execute(
+                f"INSERT INTO ChannelSummary {CHANNEL_SUMMARY_SELECT} WHERE channel_Id = %s GROUP BY channel_Id",
+                (channel_id,)
+            )
+        conn.commit()
+        record(db_round_trips=2)
+    except pymysql.MySQLError:
+        conn.rollback()
+        raise
+# Function to refresh a channel's summary at the end of a run that committed any rows, even a failed one, so the
+# summary never lags the chunks that made it in; errors are logged rather than raised
+def refresh_summary_after_run(conn, channel_id, metrics):
+    if not metrics.totals()['rows_written']:
+        return
+    try:
+        with metrics.stage('summary'):
+            refresh_channel_summary(conn, channel_id)
+    except pymysql.MySQLError as e:
+        logger.error(f"Error refreshing the channel summary of {channel_id}: {e}")
+# Function to check ChannelSummary against the base tables and rebuild it; returns the number of stale channels
+def rebuild_channel_summary(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+            SELECT COUNT(*) FROM ({CHANNEL_SUMMARY_SELECT} GROUP BY channel_Id) AS base
+            LEFT JOIN ChannelSummary AS summary ON summary.channel_Id = base.channel_Id
+            WHERE summary.channel_Id IS NULL
+            OR summary.video_count <> base.video_count
+            OR summary.total_views <> base.total_views
+            OR summary.total_likes <> base.total_likes
+            OR summary.total_comments <> base.total_comments
+            OR ABS(summary.avg_duration_seconds - base.avg_duration_seconds) > 0.001
+            """)
+            stale = cursor.fetchone()[0]
+            cursor.execute("""
+            SELECT COUNT(*) FROM ChannelSummary
+            WHERE channel_Id NOT IN (SELECT DISTINCT channel_Id FROM VideoInfo)
+            """)
+            stale += cursor.fetchone()[0]
+            cursor.execute("DELETE FROM ChannelSummary")
+            cursor.execute(f"INSERT INTO ChannelSummary {CHANNEL_SUMMARY_SELECT} GROUP BY channel_Id")
+        conn.commit()
+        bump_data_version(conn)
+        logger.info(f"Rebuilt ChannelSummary; {stale} channel(s) were out of date")
+        return stale
+    except pymysql.MySQLError as e:
+        conn.rollback()
+        logger.error(f"Error rebuilding channel summary: {e}")
+        return None
+# Number of rows written per multi-row INSERT / transaction
+BULK_CHUNK_SIZE = 1000
+# Function to build the multi-row upsert statement of a table, keyed by its first column
+def upsert_sql(table, columns):
+    key_column = columns[0]
+    return f"""
+    INSERT INTO {table} ({', '.join(columns)})
+    VALUES ({', '.join(['%s'] * len(columns))})
+    ON DUPLICATE KEY UPDATE
+    {', '.join(f'{column}=VALUES({column})' for column in columns if column != key_column)}
+    """
+# Function to log the throughput of a finished upsert; returns the rows per second
+def log_upsert(table, written, elapsed):
+    rows_per_second = written / elapsed if elapsed > 0 else 0.0
+    if written:
+        logger.info(f"{table}: upserted {written} rows in {elapsed:.2f}s ({rows_per_second:,.0f} rows/s)")
+    return rows_per_second
+# Function to upsert many rows in chunks, one transaction per chunk
+def bulk_upsert(conn, table, columns, rows, chunk_size=BULK_CHUNK_SIZE):
+    sql = upsert_sql(table, columns)
+    start = time.perf_counter()
+    written = 0
+    for chunk in chunked(rows, chunk_size):
+        chunk_start = time.perf_counter()
+        try:
+            with conn.cursor() as cursor:
+                # pymysql rewrites executemany on INSERT ... VALUES into a single multi-row statement
+                cursor.executemany(sql, chunk)
+            conn.commit()
+        except pymysql.MySQLError:
+            conn.rollback()
+            raise
+        written += len(chunk)
+        record(db_round_trips=1, rows_written=len(chunk), db_seconds=time.perf_counter() - chunk_start)
+    return written, log_upsert(table, written, time.perf_counter() - start)
+# Function to run one statement (with `many`, one executemany) as a single round trip counted in the active
+# stage; returns the rows it fetched
+def execute_counted(conn, sql, params=None, many=False):
+    with conn.cursor() as cursor:
+        if many:
+            cursor.executemany(sql, params)
+        else:
+            cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    record(db_round_trips=1)
+    return rows
+# Function to hash the content of a row, so a rerun can tell whether the stored row changed
+def row_hash(row):
+    return hashlib.blake2b(repr(row).encode('utf-8'), digest_size=16).hexdigest()
+# Function to read some columns of the stored rows with the given keys in one round trip; returns {key: (values...)}
+def fetch_stored(conn, table, key_column, keys, columns):
+    if not keys:
+        return {}
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {key_column}, {', '.join(columns)} FROM {table} "
+            f"WHERE {key_column} IN ({', '.join(['%s'] * len(keys))})",
+            keys
+        )
+        rows = cursor.fetchall()
+    record(db_round_trips=1)
+    return {row[0]: tuple(row[1:]) for row in rows}
+# Function to keep the rows of a batch that are new or differ from the stored row, with their hash appended;
+# returns them, the changed rows that live in the table's archive instead, and the snapshot rows of the
+# counters that changed, for the caller to write in one transaction
+def changed_rows(conn, table, columns, rows):
+    rows = [(*row, row_hash(row)) for row in rows]
+    snapshot = SNAPSHOTS.get(table)
+    counters = snapshot[2] if snapshot else ()
+    stored = fetch_stored(conn, table, columns[0], [row[0] for row in rows], ('row_hash', *counters))
+    hashes = {key: values[0] for key, values in stored.items()}
+    archived = {}
+    if table == 'CommentInfo':
+        # Archived comments are compared with their archived copy, so re-harvesting them moves nothing
+        archived = archived_hashes(conn, columns, [row for row in rows if row[0] not in stored])
+        hashes.update(archived)
+    changed = [row for row in rows if hashes.get(row[0]) != row[-1]]
+    record(rows_skipped=len(rows) - len(changed))
+    archived_rows = [row for row in changed if row[0] in archived]
+    changed = [row for row in changed if row[0] not in archived]
+    snapshot_rows = []
+    if snapshot and changed:
+        existing = {key: values[1:] for key, values in stored.items()}
+        # Rows cleared by a full harvest are compared with their last snapshot instead
+        existing.update(latest_snapshots(conn, table, [row[0] for row in changed if row[0] not in stored]))
+        snapshot_rows = changed_counters(table, columns, changed, existing)
+    return changed, archived_rows, snapshot_rows
+# Function to upsert only the new or changed rows of a stream of row batches; returns the number of rows written.
+# Each chunk's rows, their archived copies, their counter snapshots and whatever `on_changed` writes for them
+# (called with the chunk's changed rows) are committed together, so a failed chunk leaves none of them behind.
+def upsert_changed(conn, table, columns, batches, on_changed=None, chunk_size=BULK_CHUNK_SIZE):
+    sql = upsert_sql(table, [*columns, 'row_hash'])
+    start = time.perf_counter()
+    written = 0
+    skipped = 0
+    for batch in batches:
+        for rows in chunked(batch, chunk_size):
+            changed, archived_rows, snapshot_rows = changed_rows(conn, table, columns, rows)
+            skipped += len(rows) - len(changed) - len(archived_rows)
+            if not changed and not archived_rows:
+                continue
+            chunk_start = time.perf_counter()
+            try:
+                if changed:
+                    with conn.cursor() as cursor:
+                        cursor.executemany(sql, changed)
+                if archived_rows:
+                    update_archived_comments(conn, columns, archived_rows)
+                if snapshot_rows:
+                    write_snapshots(conn, table, snapshot_rows)
+                if on_changed is not None and changed:
+                    on_changed(changed)
+                conn.commit()
+            except pymysql.MySQLError:
+                conn.rollback()
+                raise
+            written += len(changed) + len(archived_rows)
+            record(db_round_trips=1 if changed else 0, rows_written=len(changed) + len(archived_rows),
+                   db_seconds=time.perf_counter() - chunk_start)
+    log_upsert(table, written, time.perf_counter() - start)
+    if skipped:
+        logger.info(f"{table}: skipped {skipped} unchanged rows")
+    return written
+# Function to migrate data from YouTube to MySQL tables; returns rows written per table, or None on failure.
+# Pages stream from the API through parsing into chunked writes, so memory stays flat and rows
+# committed before a failure are kept. Progress is checkpointed per stage, so a run interrupted by a
+# crash or the quota resumes where it stopped. Per-stage timings and counters are collected in `metrics`.
+# With `archive_days`, the channel's comments published more than that many days ago are archived afterwards.
+def migrate_data_to_sql(youtube, conn, channel_id, include_replies=False, metrics=None, archive_days=None):
+    metrics = metrics if metrics is not None else RunMetrics(channel_id, 'full')
+    youtube = MeteredYouTube(youtube, metrics)
+    try:
+        rows_written = {}
+        # Collect and insert channel details
+        with metrics.stage('channel'):
+            checkpoint = get_checkpoint(conn, channel_id)
+            if checkpoint:
+                logger.info(f"Resuming the interrupted harvest of channel {channel_id}")
+            channel_info = get_channel_info(youtube, channel_id)
+            rows_written['ChannelInfo'] = insert_channel_info(conn, channel_info)
+        # Collect and insert playlist details
+        with metrics.stage('playlists'):
+            if not checkpoint.get('playlists', {}).get('completed'):
+                playlist_details = get_playlist_details(youtube, channel_id)
+                rows_written['PlaylistDetails'] = insert_playlist_details(conn, playlist_details)
+                save_checkpoint(conn, channel_id, 'playlists', completed=True)
+        # Stream video details page by page from the uploads playlist
+        with metrics.stage('videos'):
+            videos_checkpoint = checkpoint.get('videos', {})
+            if not videos_checkpoint.get('completed'):
+                rows_written['VideoInfo'] = harvest_videos_resumable(
+                    youtube, conn, channel_id, channel_info['playlist_id'], videos_checkpoint.get('page_token')
+                )
+        # Stream comment details
+        with metrics.stage('comments'):
+            rows_written['CommentInfo'] = harvest_comments_resumable(youtube, conn, channel_id, include_replies)
+            save_harvest_state(conn, channel_id)
+            clear_checkpoint(conn, channel_id)
+            if archive_days:
+                apply_comment_retention(conn, channel_id, archive_days)
+        logger.info(f"Data migration to SQL completed for channel {channel_id}")
+        return rows_written
+    except Exception as e:
+        logger.error(f"Error migrating data to SQL for channel {channel_id}: {e}")
+        rows_written = None
+        return None
+    finally:
+        metrics.finish('succeeded' if rows_written is not None else 'failed')
+        # Chunks are committed as they stream, so even a failed run may have changed the data
+        refresh_summary_after_run(conn, channel_id, metrics)
+        bump_data_version(conn)
+# Pages of the uploads playlist (50 videos each) written between two video checkpoints
+CHECKPOINT_PAGES = 20
+# Videos whose comments are written between two comment checkpoints
+CHECKPOINT_VIDEOS = 200
+# Function to read the checkpoints of an interrupted harvest; returns {stage: {'page_token', 'completed'}}
+def get_checkpoint(conn, channel_id):
+    rows = execute_counted(
+        conn, "SELECT stage, page_token, completed FROM HarvestCheckpoint WHERE channel_Id = %s", (channel_id,)
+    )
+    return {stage: {'page_token': page_token, 'completed': bool(completed)} for stage, page_token, completed in rows}
+# Function to check whether a channel has an interrupted harvest to resume
+def has_checkpoint(conn, channel_id):
+    return bool(get_checkpoint(conn, channel_id))
+# Function to record the progress of one stage
+def save_checkpoint(conn, channel_id, stage, page_token=None, completed=False):
+    execute_counted(conn, """
+    INSERT INTO HarvestCheckpoint (channel_Id, stage, page_token, completed, updated_At)
+    VALUES (%s, %s, %s, %s, NOW())
+    ON DUPLICATE KEY UPDATE
+    page_token=VALUES(page_token),
+    completed=VALUES(completed),
+    updated_At=VALUES(updated_At)
+    """, (channel_id, stage, page_token, completed))
+    conn.commit()
+# Function to read the videos a stage has already finished
+def get_processed_videos(conn, channel_id, stage):
+    rows = execute_counted(
+        conn, "SELECT video_id FROM HarvestCheckpointVideo WHERE channel_Id = %s AND stage = %s", (channel_id, stage)
+    )
+    return {row[0] for row in rows}
+# Function to record videos a stage has finished
+def mark_videos_processed(conn, channel_id, stage, video_ids):
+    execute_counted(
+        conn, "INSERT IGNORE INTO HarvestCheckpointVideo (channel_Id, stage, video_id) VALUES (%s, %s, %s)",
+        [(channel_id, stage, video_id) for video_id in video_ids], many=True
+    )
+    conn.commit()
+# Function to forget the checkpoints of a channel once its harvest has finished
+def clear_checkpoint(conn, channel_id):
+    execute_counted(conn, "DELETE FROM HarvestCheckpointVideo WHERE channel_Id = %s", (channel_id,))
+    execute_counted(conn, "DELETE FROM HarvestCheckpoint WHERE channel_Id = %s", (channel_id,))
+    conn.commit()
+# Function to read the stored video IDs of a channel
+def get_channel_video_ids(conn, channel_id):
+    rows = execute_counted(conn, "SELECT video_id FROM VideoInfo WHERE channel_Id = %s", (channel_id,))
+    return [row[0] for row in rows]
+# Function to harvest the uploads playlist in segments, checkpointing the page token after each one is written
+def harvest_videos_resumable(youtube, conn, channel_id, playlist_id, page_token=None):
+    written = 0
+    # The playlist walk keeps running in the background while a segment's details are fetched and written
+    pages = run_in_background(iter_playlist_pages(youtube, playlist_id, page_token))
+    for segment in chunked(pages, CHECKPOINT_PAGES):
+        video_details = stream_video_info(youtube, [page for page, _ in segment], [])
+        written += insert_video_info(conn, video_details)
+        # Rows up to here are committed, so a rerun can start at the page after the segment
+        save_checkpoint(conn, channel_id, 'videos', segment[-1][1])
+    save_checkpoint(conn, channel_id, 'videos', completed=True)
+    return written
+# Function to harvest the comments of a channel's stored videos in groups, checkpointing each finished group
+def harvest_comments_resumable(youtube, conn, channel_id, include_replies=False):
+    processed = get_processed_videos(conn, channel_id, 'comments')
+    pending = [video_id for video_id in get_channel_video_ids(conn, channel_id) if video_id not in processed]
+    if processed:
+        logger.info(f"Skipping comments of {len(processed)} video(s) finished before the interruption")
+    written = 0
+    for group in chunked(pending, CHECKPOINT_VIDEOS):
+        written += insert_comment_info(conn, stream_comment_info(youtube, group, include_replies), channel_id)
+        mark_videos_processed(conn, channel_id, 'comments', group)
+    return written
+# Function to run a full or incremental harvest of one channel; returns rows written per table, or None on failure.
+# A full harvest clears the channel first, unless an interrupted harvest is waiting to be resumed.
+# Without `archive_days`, the channel's stored comment retention policy is applied, if it has one.
+def run_harvest(youtube, conn, channel_id, full=False, include_replies=False, metrics=None, archive_days=None):
+    if archive_days is None:
+        archive_days = get_retention_days(conn, channel_id)
+    if not full:
+        return incremental_migrate_data_to_sql(youtube, conn, channel_id, include_replies=include_replies,
+                                               metrics=metrics, archive_days=archive_days)
+    if has_checkpoint(conn, channel_id):
+        logger.info(f"Resuming the interrupted harvest of channel {channel_id} instead of clearing it")
+    else:
+        clear_existing_data(conn, channel_id)
+    return migrate_data_to_sql(youtube, conn, channel_id, include_replies, metrics, archive_days)
+# Function to apply the comment retention policy to one channel: comments published more than `days` days ago
+# move from CommentInfo into the compressed CommentArchive; returns the number moved
+def apply_comment_retention(conn, channel_id, days):
+    archived = archive_comments(conn, channel_id, days)
+    if archived:
+        logger.info(f"CommentArchive: archived {archived} comments of channel {channel_id} older than {days} days")
+    bump_data_version(conn)
+    return archived
+# Function to store a comment retention policy for every stored channel and apply it; returns the number of
+# comments moved, or None on failure. With 0 days, the channels' policies are removed and nothing is moved.
+def archive_all_comments(conn, days):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT channel_Id FROM ChannelInfo")
+            channel_ids = [row[0] for row in cursor.fetchall()]
+        archived = 0
+        for channel_id in channel_ids:
+            save_retention_days(conn, channel_id, days)
+            if days:
+                archived += apply_comment_retention(conn, channel_id, days)
+        return archived
+    except pymysql.MySQLError as e:
+        logger.error(f"Error archiving comments: {e}")
+        return None
+# Number of days of recent videos whose statistics and comments are refreshed incrementally
+REFRESH_WINDOW_DAYS = 7
+# Function to read the incremental harvest high-water mark of a channel
+def get_harvest_state(conn, channel_id):
+    rows = execute_counted(
+        conn, "SELECT last_video_id, last_published_At FROM HarvestState WHERE channel_Id = %s", (channel_id,)
+    )
+    if not rows:
+        return None
+    return {'last_video_id': rows[0][0], 'last_published_At': rows[0][1]}
+# Function to record the newest stored video of a channel as its high-water mark
+def save_harvest_state(conn, channel_id):
+    execute_counted(conn, """
+    INSERT INTO HarvestState (channel_Id, last_video_id, last_published_At, last_harvested_At)
+    SELECT %s, video_id, published_At, NOW() FROM VideoInfo
+    WHERE channel_Id = %s ORDER BY published_At DESC LIMIT 1
+    ON DUPLICATE KEY UPDATE
+    last_video_id=VALUES(last_video_id),
+    last_published_At=VALUES(last_published_At),
+    last_harvested_At=VALUES(last_harvested_At)
+    """, (channel_id, channel_id))
+    conn.commit()
+# Function to get the stored videos of a channel published within the refresh window
+def get_recent_video_ids(conn, channel_id, days=REFRESH_WINDOW_DAYS):
+    rows = execute_counted(
+        conn, "SELECT video_id FROM VideoInfo WHERE channel_Id = %s AND published_At >= NOW() - INTERVAL %s DAY",
+        (channel_id, days)
+    )
+    return [row[0] for row in rows]
+# Function to migrate only what changed since the last harvest, keeping existing rows in place
+def incremental_migrate_data_to_sql(youtube, conn, channel_id, refresh_days=REFRESH_WINDOW_DAYS, include_replies=False,
+                                    metrics=None, archive_days=None):
+    metrics = metrics if metrics is not None else RunMetrics(channel_id, 'incremental')
+    state = None
+    try:
+        # Read in the channel stage, so its round trip is counted with the run
+        with metrics.stage('channel'):
+            state = get_harvest_state(conn, channel_id)
+        if state is None:
+            # Nothing harvested yet for this channel, so the first run is a full one
+            rows_written = migrate_data_to_sql(youtube, conn, channel_id, include_replies, metrics, archive_days)
+            return rows_written
+        youtube = MeteredYouTube(youtube, metrics)
+        rows_written = {}
+        with metrics.stage('channel'):
+            channel_info = get_channel_info(youtube, channel_id)
+            rows_written['ChannelInfo'] = insert_channel_info(conn, channel_info)
+        with metrics.stage('playlists'):
+            playlist_details = get_playlist_details(youtube, channel_id)
+            rows_written['PlaylistDetails'] = insert_playlist_details(conn, playlist_details)
+        recent_video_ids = []
+        new_video_ids = []
+
+        def video_id_pages():
+            # Walk the uploads playlist (newest first) only until the known videos are reached
+            for page in iter_playlist_video_ids(
+                youtube,
+                channel_info['playlist_id'],
+                stop_video_id=state['last_video_id'],
+                since=state['last_published_At']
+            ):
+                new_video_ids.extend(page)
+                yield page
+            # Then refresh the statistics of the recent videos that were not just fetched
+            known_new_ids = set(new_video_ids)
+            yield from chunked(
+                [video_id for video_id in recent_video_ids if video_id not in known_new_ids], VIDEO_BATCH_SIZE
+            )
+
+        video_ids = []
+        with metrics.stage('videos'):
+            recent_video_ids.extend(get_recent_video_ids(conn, channel_id, refresh_days))
+            video_details = stream_video_info(youtube, video_id_pages(), video_ids)
+            rows_written['VideoInfo'] = insert_video_info(conn, video_details)
+        with metrics.stage('comments'):
+            comment_details = stream_comment_info(youtube, video_ids, include_replies)
+            rows_written['CommentInfo'] = insert_comment_info(conn, comment_details, channel_id)
+            save_harvest_state(conn, channel_id)
+            if archive_days:
+                apply_comment_retention(conn, channel_id, archive_days)
+        logger.info(
+            f"Incremental migration completed for channel {channel_id}: {len(new_video_ids)} new video(s), "
+            f"{len(video_ids) - len(new_video_ids)} recent video(s) refreshed."
+        )
+        return rows_written
+    except Exception as e:
+        logger.error(f"Error migrating data to SQL for channel {channel_id}: {e}")
+        rows_written = None
+        return None
+    finally:
+        metrics.finish('succeeded' if rows_written is not None else 'failed')
+        # A run that fell back to a full one has refreshed the summary already
+        if state is not None:
+            refresh_summary_after_run(conn, channel_id, metrics)
+        bump_data_version(conn)
+# Function to get channel information
+def get_channel_info(youtube, channel_id):
+    try:
+        request = youtube.channels().list(
+            part="snippet,statistics,contentDetails",
+            id=channel_id
+        )
+        response = request.execute()
+        channel_info = {
+            'channel_Id': response['items'][0]['id'],
+            'channel_Name': response['items'][0]['snippet']['title'],
+            'subscription_count': int(response['items'][0]['statistics']['subscriberCount']),
+            'channel_views': int(response['items'][0]['statistics']['viewCount']),
+            'Total_videos': int(response['items'][0]['statistics']['videoCount']),
+            'channel_description': response['items'][0]['snippet']['description'],
+            'playlist_id': response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        }
+        return channel_info
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching channel info: {e}")
+        return None
+# Function to insert channel information into MySQL
+def insert_channel_info(conn, channel_data):
+    try:
+        columns = ['channel_Id', 'channel_Name', 'subscription_count', 'channel_views',
+                   'Total_videos', 'channel_description', 'playlist_id']
+        return upsert_changed(conn, 'ChannelInfo', columns, [[tuple(channel_data[column] for column in columns)]])
+    except pymysql.MySQLError as e:
+        logger.error(f"Error inserting channel info into MySQL: {e}")
+        # The caller must see the failure, so the run is not reported as succeeded nor its checkpoint advanced
+        raise
+# Function to get playlist details
+def get_playlist_details(youtube, channel_id):
+    try:
+        next_page_token = None
+        all_data = []
+        while True:
+            request = youtube.playlists().list(
+                part='snippet,contentDetails',
+                channelId=channel_id,
+                maxResults=50,
+                pageToken=next_page_token
+            )
+            response = request.execute()
+            for item in response['items']:
+                data = {
+                    'Playlist_Id': item['id'],
+                    'Title': item['snippet']['title'],
+                    'Channel_Id': item['snippet']['channelId'],
+                    'Channel_Name': item['snippet']['channelTitle'],
+                    'PublishedAt': item['snippet']['publishedAt'],
+                    'Video_count': item['contentDetails']['itemCount']
+                }
+                all_data.append(data)
+            next_page_token = response.get('nextPageToken')
+            if not next_page_token:
+                break
+        return all_data
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching playlist details: {e}")
+        return []
+# Function to insert playlist details into MySQL
+def insert_playlist_details(conn, playlist_data):
+    try:
+        columns = ['Playlist_Id', 'Title', 'Channel_Id', 'Channel_Name', 'PublishedAt', 'Video_count']
+        rows = (
+            row
+            for batch in chunked(playlist_data, BULK_CHUNK_SIZE)
+            for row in transform_playlists(batch, columns)
+        )
+        written, _ = bulk_upsert(conn, 'PlaylistDetails', columns, rows)
+        return written
+    except pymysql.MySQLError as e:
+        logger.error(f"Error inserting playlist info into MySQL: {e}")
+        raise
+# Function to walk an uploads playlist page by page, optionally stopping at the last known video;
+# yields each page of video IDs with the token of the page after it (None after the last page)
+def iter_playlist_pages(youtube, playlist_id, page_token=None, stop_video_id=None, since=None):
+    while True:
+        response = youtube.playlistItems().list(
+            part='contentDetails',
+            playlistId=playlist_id,
+            maxResults=50,
+            pageToken=page_token
+        ).execute()
+        page = []
+        for item in response['items']:
+            video_id = item['contentDetails']['videoId']
+            published_at = item['contentDetails'].get('videoPublishedAt')
+            if (stop_video_id is not None and video_id == stop_video_id) or \
+                    (since is not None and published_at and parse_iso_date(published_at) <= str(since)):
+                if page:
+                    yield page, None
+                return
+            page.append(video_id)
+        page_token = response.get('nextPageToken')
+        if page:
+            yield page, page_token
+        if not page_token:
+            break
+# Function to walk an uploads playlist page by page, optionally stopping at the last known video
+def iter_playlist_video_ids(youtube, playlist_id, stop_video_id=None, since=None):
+    for page, _ in iter_playlist_pages(youtube, playlist_id, stop_video_id=stop_video_id, since=since):
+        yield page
+# Function to get every video ID of an uploads playlist, optionally stopping at the last known video
+def get_playlist_video_ids(youtube, playlist_id, stop_video_id=None, since=None):
+    return [
+        video_id
+        for page in iter_playlist_video_ids(youtube, playlist_id, stop_video_id, since)
+        for video_id in page
+    ]
+# Function to get video IDs
+def get_videos_ids(youtube, channel_id):
+    try:
+        response = youtube.channels().list(
+            id=channel_id,
+            part='contentDetails'
+        ).execute()
+        playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        return get_playlist_video_ids(youtube, playlist_id)
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching video IDs: {e}")
+        return []
+# Function to convert a single ISO 8601 duration (e.g. PT4M13S, P1DT2H) to HH:MM:SS
+def parse_duration(iso_duration):
+    total = duration_to_seconds(iso_duration)
+    if total is None:
+        logger.warning(f"Invalid ISO 8601 duration format: {iso_duration}")
+    return format_seconds(total)
+# Function to parse a counter the API sends as a string; missing counters (e.g. hidden likes) stay None
+def count(value):
+    return None if value is None else int(value)
+# Maximum number of IDs the videos().list endpoint accepts per request
+VIDEO_BATCH_SIZE = 50
+# Function to split any iterable into lists of a fixed size without materialising it
+def chunked(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+# Function to fetch video information 50 IDs per request, yielding one record batch of videos per request
+def iter_video_info(youtube, video_ids, missing_ids):
+    for batch in chunked(video_ids, VIDEO_BATCH_SIZE):
+        request = youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            id=",".join(batch)
+        )
+        response = request.execute()
+        # The API does not guarantee response order, so map items back to their IDs
+        items_by_id = {item['id']: item for item in response.get("items", [])}
+        video_data = []
+        for video_id in batch:
+            item = items_by_id.get(video_id)
+            if item is None:
+                # Deleted or private videos are silently dropped by the API
+                missing_ids.append(video_id)
+                continue
+            data = {
+                'video_id': item['id'],
+                'channel_Name': item['snippet']['channelTitle'],
+                'channel_Id': item['snippet']['channelId'],
+                'video_description': item["snippet"]["description"],
+                'tags': item["snippet"].get("tags", []),
+                'published_At': item["snippet"]["publishedAt"],
+                'view_count': count(item["statistics"]["viewCount"]),
+                'like_count': count(item["statistics"].get("likeCount")),
+                'dislike_count': count(item["statistics"].get("dislikeCount", 0)),
+                'favorite_count': count(item["statistics"]["favoriteCount"]),
+                'comment_count': count(item["statistics"].get("commentCount", 0)),
+                'duration': item["contentDetails"]["duration"],
+                'thumbnail': item["snippet"]["thumbnails"]["high"]["url"],
+                'caption_status': item["contentDetails"]["caption"]
+            }
+            video_data.append(data)
+        yield to_record_batch(video_data, VIDEO_BATCH_SCHEMA)
+# Function to warn about videos the API did not return
+def report_missing_videos(missing_ids):
+    if missing_ids:
+        logger.warning(f"{len(missing_ids)} video(s) were not returned by the API (deleted or private): {', '.join(missing_ids)}")
+# Function to get video information as a list of record batches (VIDEO_BATCH_SCHEMA)
+def get_video_info(youtube, video_ids):
+    try:
+        missing_ids = []
+        video_data = list(iter_video_info(youtube, video_ids, missing_ids))
+        report_missing_videos(missing_ids)
+        return video_data
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching video info: {e}")
+        return []
+# Function to stream record batches of video information for pages of video IDs, fetching in a background stage
+def stream_video_info(youtube, video_id_pages, fetched_ids):
+    missing_ids = []
+    def fetch():
+        for page in video_id_pages:
+            fetched_ids.extend(page)
+            yield from iter_video_info(youtube, page, missing_ids)
+    yield from run_in_background(fetch())
+    report_missing_videos(missing_ids)
+# Function to insert video information (record batches or a table) into MySQL
+def insert_video_info(conn, video_data):
+    try:
+        columns = ['video_id', 'channel_Name', 'channel_Id', 'video_description', 'tags', 'published_At',
+                   'view_count', 'like_count', 'dislike_count', 'favorite_count', 'comment_count',
+                   'duration', 'duration_seconds', 'thumbnail', 'caption_status']
+        # Whole chunks are parsed column-wise instead of row by row
+        batches = (transform_videos(table, columns) for table in rebatch(video_data, BULK_CHUNK_SIZE))
+        return upsert_changed(conn, 'VideoInfo', columns, batches, lambda rows: replace_video_tags(conn, columns, rows))
+    except pymysql.MySQLError as e:
+        logger.error(f"Error inserting video info into MySQL: {e}")
+        raise
+# Function to normalise a tag for the VideoTag table and for tag lookups
+def normalize_tag(tag):
+    return tag.strip().lower()[:255]
+# Function to split the comma-joined tags of a video into distinct normalised tags
+def split_tags(tags):
+    return sorted({normalize_tag(tag) for tag in (tags or '').split(',') if tag.strip()})
+# Function to replace the VideoTag rows of some VideoInfo rows with the tags they carry now, without committing
+def replace_video_tags(conn, columns, rows):
+    tags_index = columns.index('tags')
+    video_ids = [row[0] for row in rows]
+    tag_rows = [(row[0], tag) for row in rows for tag in split_tags(row[tags_index])]
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM VideoTag WHERE video_id IN ({', '.join(['%s'] * len(video_ids))})", video_ids
+        )
+        if tag_rows:
+            cursor.executemany("INSERT IGNORE INTO VideoTag (video_id, tag) VALUES (%s, %s)", tag_rows)
+    # Committed by the caller together with the VideoInfo rows
+    record(db_round_trips=2 if tag_rows else 1)
+# Page size and worker count for the concurrent comment harvester
+COMMENT_PAGE_SIZE = 100
+COMMENT_WORKERS = 8
+# Maximum number of fetched pages buffered between a fetch stage and the DB writer
+PIPELINE_QUEUE_SIZE = 8
+# Function to put an item on a bounded queue, giving up once `stop` is set; returns whether it was queued
+def bounded_put(items, item, stop):
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+# Function to run a generator in a background thread, handing its items over through a bounded queue
+def run_in_background(iterable, maxsize=PIPELINE_QUEUE_SIZE):
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not bounded_put(items, (False, item), stop):
+                    return
+        except BaseException as e:
+            bounded_put(items, (True, e), stop)
+            return
+        bounded_put(items, (True, None), stop)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            finished, item = items.get()
+            if finished:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+_thread_state = threading.local()
+# httplib2 is not thread safe, so every worker thread executes requests on its own Http object
+def thread_http():
+    if not hasattr(_thread_state, 'http'):
+        _thread_state.http = build_http()
+    return _thread_state.http
+# Http stand-in for a shared client that sends every request on the calling thread's own Http object
+class ThreadLocalHttp:
+    def request(self, *args, **kwargs):
+        return thread_http().request(*args, **kwargs)
+# Function to build a CommentInfo row from a comment snippet
+def comment_row(comment_id, video_id, comment):
+    return {
+        'comment_id': comment_id,
+        'video_id': video_id,
+        'author': comment["authorDisplayName"],
+        'comment_published_at': comment["publishedAt"],
+        'comment_text': comment["textDisplay"],
+        'like_count': comment["likeCount"],
+        'viewer_rating': comment.get("viewerRating", "none"),
+        'comment_updated_at': comment["updatedAt"]
+    }
+# Function to get every reply of a comment thread
+def get_comment_replies(youtube, video_id, parent_id):
+    replies = []
+    next_page_token = None
+    while True:
+        response = youtube.comments().list(
+            part="snippet",
+            parentId=parent_id,
+            maxResults=COMMENT_PAGE_SIZE,
+            pageToken=next_page_token
+        ).execute(http=thread_http())
+        for item in response["items"]:
+            replies.append(comment_row(item["id"], video_id, item["snippet"]))
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            break
+    return replies
+# Function to get the comment threads (and optionally their replies) of one video, one record batch per page
+def iter_video_comment_pages(youtube, video_id, include_replies=False):
+    next_page_token = None
+    while True:
+        response = youtube.commentThreads().list(
+            part="snippet,replies" if include_replies else "snippet",
+            videoId=video_id,
+            maxResults=COMMENT_PAGE_SIZE,
+            pageToken=next_page_token
+        ).execute(http=thread_http())
+        comment_data = []
+        for item in response["items"]:
+            comment = item["snippet"]["topLevelComment"]["snippet"]
+            comment_data.append(comment_row(item["id"], video_id, comment))
+            if include_replies and item["snippet"].get("totalReplyCount", 0):
+                inline_replies = item.get("replies", {}).get("comments", [])
+                # The thread only embeds a few replies; fetch the rest when it is truncated
+                if len(inline_replies) < item["snippet"]["totalReplyCount"]:
+                    comment_data.extend(get_comment_replies(youtube, video_id, item["id"]))
+                else:
+                    for reply in inline_replies:
+                        comment_data.append(comment_row(reply["id"], video_id, reply["snippet"]))
+        yield to_record_batch(comment_data, COMMENT_BATCH_SCHEMA)
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            break
+# Function to get every comment thread (and optionally its replies) of one video as a table
+def get_video_comments(youtube, video_id, include_replies=False):
+    return pa.Table.from_batches(
+        list(iter_video_comment_pages(youtube, video_id, include_replies)), schema=COMMENT_BATCH_SCHEMA
+    )
+# Function to stream record batches of comments of many videos, fetched concurrently into a bounded queue
+def stream_comment_info(youtube, video_ids, include_replies=False, max_workers=COMMENT_WORKERS,
+                        queue_size=PIPELINE_QUEUE_SIZE):
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def fetch(video_id):
+        if stop.is_set():
+            return
+        try:
+            for page in iter_video_comment_pages(youtube, video_id, include_replies):
+                if not bounded_put(pages, ('page', video_id, page), stop):
+                    return
+        except Exception as e:
+            bounded_put(pages, ('error', video_id, e), stop)
+
+    def produce():
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for video_id in video_ids:
+                executor.submit(fetch, video_id)
+        bounded_put(pages, ('done', None, None), stop)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        # Logging happens on the consuming thread so the UI can show it
+        while True:
+            kind, video_id, payload = pages.get()
+            if kind == 'done':
+                break
+            if kind == 'page':
+                yield payload
+            elif isinstance(payload, QuotaExceededError):
+                raise payload
+            elif 'commentsDisabled' in str(payload):
+                logger.warning(f"Comments are disabled for video ID {video_id}. Skipping this video.")
+            else:
+                logger.error(f"Error fetching comments for video ID {video_id}: {payload}")
+    finally:
+        # Unblocks and stops the fetchers if the consumer finished early or failed
+        stop.set()
+# Function to get comment information for many videos concurrently, as a list of record batches
+def get_comment_info(youtube, video_ids, include_replies=False, max_workers=COMMENT_WORKERS):
+    try:
+        return list(stream_comment_info(youtube, video_ids, include_replies, max_workers))
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching comment info: {e}")
+        return []
+# Function to insert the comments (record batches or a table) of one channel into MySQL
+def insert_comment_info(conn, comment_data, channel_id):
+    try:
+        columns = ['comment_id', 'video_id', 'channel_Id', 'author', 'comment_published_at', 'comment_text',
+                   'like_count', 'viewer_rating', 'comment_updated_at']
+        # The channel leads CommentInfo's primary key; the API pages only carry the video
+        batches = (
+            transform_comments(table.append_column('channel_Id', pa.repeat(channel_id, table.num_rows)), columns)
+            for table in rebatch(comment_data, BULK_CHUNK_SIZE)
+        )
+        return upsert_changed(conn, 'CommentInfo', columns, batches)
+    except pymysql.MySQLError as e:
+        logger.error(f"Error inserting comment info into MySQL: {e}")
+        raise
+# Function to run a query into a DataFrame; returns None if it failed
+def read_query(query, user, password, params=None):
+    with db_connection(user, password) as conn:
+        if conn:
+            try:
+                return pd.read_sql(query, conn, params=params)
+            except pymysql.MySQLError as e:
+                logger.error(f"Error executing query: {e}")
+    return None
+# Function to execute SQL queries and return results as a DataFrame
+def execute_query(query, user, password, params=None):
+    df = read_query(query, user, password, params)
+    return df if df is not None else pd.DataFrame()
+# Memory budget of the query result cache
+QUERY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# LRU cache of query results, bounded by the memory the cached DataFrames use
+class QueryResultCache:
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (df, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+# Seconds a version read from DataVersion is reused, so the queries of one page render read it once
+DATA_VERSION_CHECK_SECONDS = 1.0
+# Bumps made by this process; they invalidate its caches even if DataVersion could not be updated
+_data_version = 0
+_data_version_lock = threading.Lock()
+# Last version read from DataVersion per user: (monotonic time read, version)
+_stored_versions = {}
+# Function to read the shared version row; returns None if it cannot be read
+def read_data_version(user, password):
+    with db_connection(user, password) as conn:
+        if conn is None:
+            return None
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT version FROM DataVersion WHERE id = 1")
+                row = cursor.fetchone()
+            return row[0] if row else None
+        except pymysql.MySQLError:
+            return None
+# Function to read the version that changes whenever harvested data changes, in this or any other process
+# (the CLI, another app process or a job runner)
+def data_version(user, password):
+    now = time.monotonic()
+    with _data_version_lock:
+        checked = _stored_versions.get(user)
+    if checked is None or now - checked[0] >= DATA_VERSION_CHECK_SECONDS:
+        checked = (now, read_data_version(user, password))
+        with _data_version_lock:
+            _stored_versions[user] = checked
+    return checked[1], _data_version
+# Function to invalidate every cached query result and chart after the data changed, in every process
+def bump_data_version(conn):
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+        # The next read sees this bump at once instead of after DATA_VERSION_CHECK_SECONDS
+        _stored_versions.clear()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE DataVersion SET version = version + 1 WHERE id = 1")
+        conn.commit()
+    except pymysql.MySQLError as e:
+        logger.error(f"Error bumping the data version: {e}")
+# Shared query result cache
+def get_query_cache():
+    return shared_instance(('query_cache',), QueryResultCache)
+# Function to execute a query through the result cache; returns the DataFrame and whether it was served warm
+def cached_query(query, user, password, params=None):
+    key = (query, tuple(params) if params is not None else None, user, data_version(user, password))
+    cache = get_query_cache()
+    df = cache.get(key)
+    if df is not None:
+        return df, True
+    df = read_query(query, user, password, params)
+    if df is None:
+        return pd.DataFrame(), False
+    cache.put(key, df)
+    return df, False
+
+def check_channel_id(channel_id, user, password):
+    with db_connection(user, password) as conn:
+        if conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM ChannelInfo WHERE channel_Id = %s", (channel_id,))
+                count = cursor.fetchone()[0]
+                return count > 0
+    return False
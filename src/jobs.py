@@ -0,0 +1,176 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+
+from harvester import db_connection, logger, read_query, run_harvest, shared_instance, youtube_client
+from metrics import RunMetrics, export_run
+from warehouse import sync_channel
+
+# Harvests run at the same time per server process
+JOB_WORKERS = 2
+# Seconds between progress writes of a running job
+JOB_PROGRESS_INTERVAL = 2.0
+# Seconds between heartbeats of a runner's queued and running jobs
+JOB_HEARTBEAT_INTERVAL = 10.0
+# Seconds without a heartbeat after which a job's runner is considered dead
+JOB_STALE_SECONDS = 60
+# Lifecycle of a job
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+
+
+# Function to update columns of a job row; the columns named in `now` are set to the current time
+def update_job(conn, job_id, now=(), **fields):
+    assignments = [f"{column} = %s" for column in fields] + [f"{column} = NOW()" for column in now]
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE HarvestJob SET {', '.join(assignments)} WHERE job_id = %s", (*fields.values(), job_id)
+        )
+    conn.commit()
+
+
+# Function to list the most recent jobs, newest first; returns None if the job table cannot be read
+def list_jobs(user, password, limit=20):
+    return read_query(
+        "SELECT job_id, channel_Id, mode, status, rows_written, progress, error, created_At, started_At, finished_At "
+        "FROM HarvestJob ORDER BY job_id DESC LIMIT %s",
+        user, password, (limit,)
+    )
+
+
+# Worker pool owned by the server process that runs harvests as jobs recorded in HarvestJob
+class JobRunner:
+    def __init__(self, user, password, max_workers=JOB_WORKERS):
+        self.user = user
+        self.password = password
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='harvest-job')
+        # RunMetrics of the jobs running in this process, for live progress
+        self.live = {}
+        self._lock = threading.Lock()
+        # Identifies this runner's jobs among those of other runners, processes and hosts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.recover()
+        threading.Thread(target=self.heartbeat, daemon=True).start()
+
+    def recover(self):
+        # Jobs left queued or running whose runner stopped sending heartbeats will never finish;
+        # jobs of runners that are still alive, in this process or another one, are left alone
+        with db_connection(self.user, self.password) as conn:
+            if conn is None:
+                return
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                    UPDATE HarvestJob SET status = 'failed', error = 'Interrupted: its job runner stopped',
+                    finished_At = NOW()
+                    WHERE status IN ('queued', 'running') AND (owner IS NULL OR owner <> %s)
+                    AND (heartbeat_At IS NULL OR heartbeat_At < NOW() - INTERVAL %s SECOND)
+                    """, (self.owner, JOB_STALE_SECONDS))
+                conn.commit()
+            except pymysql.MySQLError as e:
+                logger.error(f"Error recovering harvest jobs: {e}")
+
+    def heartbeat(self):
+        # Marks this runner's jobs as alive, then fails the jobs of runners that died since the last beat
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            with db_connection(self.user, self.password) as conn:
+                if conn is None:
+                    continue
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "UPDATE HarvestJob SET heartbeat_At = NOW() "
+                            "WHERE owner = %s AND status IN ('queued', 'running')",
+                            (self.owner,)
+                        )
+                    conn.commit()
+                except pymysql.MySQLError as e:
+                    logger.error(f"Error sending the heartbeat of harvest jobs: {e}")
+            self.recover()
+
+    def submit(self, api_key, channel_id, mode='incremental', include_replies=False, sync_warehouse=False):
+        # Returns the new job's ID, or None if it could not be recorded
+        with db_connection(self.user, self.password) as conn:
+            if conn is None:
+                return None
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO HarvestJob (channel_Id, mode, status, owner, created_At, heartbeat_At) "
+                        "VALUES (%s, %s, 'queued', %s, NOW(), NOW())",
+                        (channel_id, mode, self.owner)
+                    )
+                    job_id = cursor.lastrowid
+                conn.commit()
+            except pymysql.MySQLError as e:
+                logger.error(f"Error queueing harvest job: {e}")
+                return None
+        self.executor.submit(self.run, job_id, api_key, channel_id, mode, include_replies, sync_warehouse)
+        return job_id
+
+    def progress(self, job_id):
+        # Live RunMetrics of a job running in this process, or None
+        with self._lock:
+            return self.live.get(job_id)
+
+    def save_progress(self, job_id, run, stop):
+        # Writes the counters of a running job until it finishes; a failed write is logged and retried next time
+        while not stop.wait(JOB_PROGRESS_INTERVAL):
+            try:
+                with db_connection(self.user, self.password) as conn:
+                    if conn is None:
+                        continue
+                    update_job(conn, job_id, progress=json.dumps(run.as_dict()),
+                               rows_written=run.totals()['rows_written'])
+            except Exception as e:
+                logger.error(f"Error saving progress of harvest job {job_id}: {e}")
+
+    def run(self, job_id, api_key, channel_id, mode, include_replies, sync_warehouse):
+        run = RunMetrics(channel_id, mode)
+        with self._lock:
+            self.live[job_id] = run
+        stop = threading.Event()
+        rows_written = None
+        error = None
+        try:
+            with db_connection(self.user, self.password) as conn:
+                if conn is None:
+                    raise RuntimeError("could not connect to MySQL")
+                update_job(conn, job_id, now=('started_At',), status='running')
+                threading.Thread(target=self.save_progress, args=(job_id, run, stop), daemon=True).start()
+                rows_written = run_harvest(
+                    youtube_client(api_key), conn, channel_id, mode == 'full', include_replies, run
+                )
+            export_run(run)
+            if rows_written is None:
+                # The migration logs its own errors; the failing stage keeps the message
+                error = next((stage.error for stage in run.stage_list() if stage.error), 'Migration failed')
+            elif sync_warehouse and sync_channel(self.user, self.password, channel_id, full=mode == 'full') is None:
+                error = 'Parquet warehouse sync failed'
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Harvest job {job_id} failed: {e}")
+        finally:
+            stop.set()
+            with self._lock:
+                self.live.pop(job_id, None)
+            with db_connection(self.user, self.password) as conn:
+                if conn is not None:
+                    try:
+                        update_job(
+                            conn, job_id, now=('finished_At',), status='failed' if error else 'done', error=error,
+                            progress=json.dumps(run.as_dict()), rows_written=run.totals()['rows_written']
+                        )
+                    except pymysql.MySQLError as e:
+                        logger.error(f"Error finishing harvest job {job_id}: {e}")
+
+
+# One job runner per set of credentials, shared by every session of the server process
+def get_job_runner(user, password):
+    return shared_instance(('jobs', user, password), lambda: JobRunner(user, password))
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger('harvester.metrics')
+
+# Every finished run is appended here as one JSON object per line
+METRICS_JSONL_PATH = 'harvest_metrics.jsonl'
+# Latest run per channel in Prometheus text format, for the node_exporter textfile collector
+METRICS_PROM_PATH = 'harvest_metrics.prom'
+# Counters kept per stage
+COUNTERS = ('api_calls', 'quota_units', 'pages', 'cache_hits', 'cache_revalidated', 'cache_misses',
+            'cache_bytes_saved', 'retries', 'rows_written', 'rows_skipped', 'rows_archived', 'db_round_trips')
+# Timers kept per stage, in seconds
+TIMERS = ('seconds', 'api_seconds', 'db_seconds')
+# Prometheus help text per exported stage field
+PROMETHEUS_HELP = {
+    'seconds': "Wall-clock duration of the stage",
+    'api_seconds': "Time spent waiting on API responses, summed over threads",
+    'db_seconds': "Time spent in bulk writes",
+    'api_calls': "API requests sent, including retries",
+    'quota_units': "Quota units charged",
+    'pages': "API response pages consumed, including cached ones",
+    'cache_hits': "API responses served from the response cache",
+    'cache_revalidated': "Cached API responses confirmed unchanged by a 304 reply",
+    'cache_misses': "API responses downloaded because the cache had no usable copy",
+    'cache_bytes_saved': "Response bytes served from the cache instead of downloaded",
+    'retries': "API requests retried after a transient error",
+    'rows_written': "Rows upserted",
+    'rows_skipped': "Rows left unwritten because their content hash was unchanged",
+    'rows_archived': "Comments moved into the compressed archive by the retention policy",
+    'db_round_trips': "Statements sent to MySQL",
+}
+
+_active = threading.local()
+
+
+# Counters and timers of one stage (channel, playlists, videos, comments) of a harvest run
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.values = dict.fromkeys(COUNTERS, 0)
+        self.values.update(dict.fromkeys(TIMERS, 0.0))
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.values[key] += amount
+
+    def as_dict(self):
+        with self._lock:
+            values = dict(self.values)
+        for key in TIMERS:
+            values[key] = round(values[key], 4)
+        return {'stage': self.name, **values, 'error': self.error}
+
+
+# Function to add to the counters of the stage active on the current thread, if any
+def record(**amounts):
+    stage = getattr(_active, 'stage', None)
+    if stage is not None:
+        stage.add(**amounts)
+
+
+# Context manager that makes a stage the target of record() on the current thread
+@contextmanager
+def active_stage(stage):
+    previous = getattr(_active, 'stage', None)
+    _active.stage = stage
+    try:
+        yield stage
+    finally:
+        _active.stage = previous
+
+
+# Timing spans and counters of one migration of one channel
+class RunMetrics:
+    def __init__(self, channel_id, mode='full'):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.channel_id = channel_id
+        self.mode = mode
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.status = 'running'
+        self.stages = {}
+        # Guards self.stages, which other threads read while the run adds stages
+        self._lock = threading.Lock()
+        # The stage currently running; API requests made on worker threads are attributed to it
+        self.current = None
+        self._started = time.perf_counter()
+        self.seconds = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        with self._lock:
+            stage = self.stages.setdefault(name, StageMetrics(name))
+        self.current = stage
+        start = time.perf_counter()
+        try:
+            with active_stage(stage):
+                yield stage
+        except Exception as e:
+            stage.error = str(e)
+            raise
+        finally:
+            stage.add(seconds=time.perf_counter() - start)
+            self.current = None
+
+    def finish(self, status):
+        # An incremental run that falls back to a full one is finished by the inner call first
+        if self.finished_at is None:
+            self.status = status
+            self.finished_at = datetime.now(timezone.utc)
+            self.seconds = time.perf_counter() - self._started
+
+    def stage_list(self):
+        # A copy, safe to iterate while the run adds stages on another thread
+        with self._lock:
+            return list(self.stages.values())
+
+    def totals(self):
+        totals = dict.fromkeys(COUNTERS, 0)
+        for stage in self.report_rows():
+            for key in COUNTERS:
+                totals[key] += stage[key]
+        return totals
+
+    def report_rows(self):
+        return [stage.as_dict() for stage in self.stage_list()]
+
+    def as_dict(self):
+        return {
+            'run_id': self.run_id,
+            'channel_id': self.channel_id,
+            'mode': self.mode,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'seconds': round(self.seconds, 4),
+            'totals': self.totals(),
+            'stages': self.report_rows(),
+        }
+
+
+# A list() request whose responses are counted against the run's current stage
+class MeteredRequest:
+    def __init__(self, run, request):
+        self.run = run
+        self.request = request
+
+    def execute(self, **kwargs):
+        stage = self.run.current
+        start = time.perf_counter()
+        # Worker threads have no active stage of their own, so the request carries it
+        with active_stage(stage):
+            try:
+                return self.request.execute(**kwargs)
+            finally:
+                record(pages=1, api_seconds=time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.request, name)
+
+
+class MeteredResource:
+    def __init__(self, run, resource):
+        self.run = run
+        self.resource = resource
+
+    def list(self, **params):
+        return MeteredRequest(self.run, self.resource.list(**params))
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
+
+# Drop-in wrapper around a YouTube client that attributes every request to a RunMetrics stage
+class MeteredYouTube:
+    def __init__(self, youtube, run):
+        self.youtube = youtube
+        self.run = run
+
+    def __getattr__(self, name):
+        attribute = getattr(self.youtube, name)
+        if not callable(attribute):
+            return attribute
+
+        def resource(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            # Only resource collections (channels(), videos(), ...) have list()
+            return MeteredResource(self.run, result) if hasattr(result, 'list') else result
+        return resource
+
+
+_latest_runs = {}
+_export_lock = threading.Lock()
+
+
+# Function to escape a Prometheus label value
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Function to render the latest run of every channel in the Prometheus text exposition format
+def prometheus_text(runs):
+    lines = []
+    for field in TIMERS + COUNTERS:
+        name = f"youtube_harvest_stage_{field}"
+        lines.append(f"# HELP {name} {PROMETHEUS_HELP[field]} in the latest run of the channel.")
+        lines.append(f"# TYPE {name} gauge")
+        for run in runs:
+            for stage in run.report_rows():
+                labels = (f'channel="{label_value(run.channel_id)}",mode="{run.mode}",'
+                          f'stage="{label_value(stage["stage"])}"')
+                lines.append(f"{name}{{{labels}}} {stage[field]}")
+    lines.append("# HELP youtube_harvest_run_success Whether the latest run of the channel succeeded.")
+    lines.append("# TYPE youtube_harvest_run_success gauge")
+    for run in runs:
+        lines.append(f'youtube_harvest_run_success{{channel="{label_value(run.channel_id)}"}} '
+                     f'{1 if run.status == "succeeded" else 0}')
+    lines.append("# HELP youtube_harvest_run_finished_timestamp_seconds When the latest run of the channel ended.")
+    lines.append("# TYPE youtube_harvest_run_finished_timestamp_seconds gauge")
+    for run in runs:
+        finished = run.finished_at.timestamp() if run.finished_at else 0
+        lines.append(f'youtube_harvest_run_finished_timestamp_seconds{{channel="{label_value(run.channel_id)}"}} '
+                     f'{finished:.0f}')
+    return "\n".join(lines) + "\n"
+
+
+# Function to append a finished run to the JSON lines log and rewrite the Prometheus file
+def export_run(run, jsonl_path=METRICS_JSONL_PATH, prom_path=METRICS_PROM_PATH):
+    with _export_lock:
+        _latest_runs[run.channel_id] = run
+        try:
+            with open(jsonl_path, 'a', encoding='utf-8') as handle:
+                handle.write(json.dumps(run.as_dict()) + "\n")
+            # Written to a temporary file and renamed so a scrape never sees a half-written file
+            temporary_path = f"{prom_path}.tmp"
+            with open(temporary_path, 'w', encoding='utf-8') as handle:
+                handle.write(prometheus_text(list(_latest_runs.values())))
+            os.replace(temporary_path, prom_path)
+        except OSError as e:
+            logger.error(f"Error writing harvest metrics: {e}")
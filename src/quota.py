@@ -0,0 +1,189 @@
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+from metrics import record
+
+# Default daily quota of a YouTube Data API v3 project
+DAILY_QUOTA = 10000
+# Quota units charged per list() request, per endpoint
+ENDPOINT_COSTS = {
+    'channels': 1,
+    'playlists': 1,
+    'playlistItems': 1,
+    'videos': 1,
+    'commentThreads': 1,
+    'comments': 1,
+    'search': 100,
+}
+# Quota is reset at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+# Error reasons that are worth retrying after a pause
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError', 'internalError'}
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+# Function to extract the error reason (e.g. 'quotaExceeded') from an HttpError
+def error_reason(error):
+    try:
+        return error.error_details[0]['reason']
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return ''
+
+
+# Function to count the 50-item pages needed to list `count` items
+def pages_needed(count):
+    return max(1, math.ceil(count / 50))
+
+
+# Function to estimate the quota units needed to harvest a channel
+def estimate_channel_cost(total_videos, total_playlists=50, comment_pages_per_video=1):
+    return (
+        ENDPOINT_COSTS['channels'] * 2
+        + ENDPOINT_COSTS['playlists'] * pages_needed(total_playlists)
+        + ENDPOINT_COSTS['playlistItems'] * pages_needed(total_videos)
+        + ENDPOINT_COSTS['videos'] * pages_needed(total_videos)
+        + ENDPOINT_COSTS['commentThreads'] * total_videos * comment_pages_per_video
+    )
+
+
+# Central scheduler every API request goes through: quota accounting, pacing and retries
+class QuotaScheduler:
+    def __init__(self, daily_quota=DAILY_QUOTA, rate=10.0, burst=20, max_retries=5, base_delay=1.0):
+        self.daily_quota = daily_quota
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.used = 0
+        self.retries = 0
+        self.used_by_endpoint = {}
+        self._day = self._quota_day()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quota_day():
+        return datetime.now(QUOTA_TIMEZONE).date()
+
+    @property
+    def remaining(self):
+        with self._lock:
+            self._roll_day()
+            return self.daily_quota - self.used
+
+    def _roll_day(self):
+        today = self._quota_day()
+        if today != self._day:
+            self._day = today
+            self.used = 0
+            self.used_by_endpoint = {}
+
+    def _charge(self, endpoint):
+        cost = ENDPOINT_COSTS.get(endpoint, 1)
+        with self._lock:
+            self._roll_day()
+            if self.used + cost > self.daily_quota:
+                raise QuotaExceededError(
+                    f"Daily quota budget exhausted ({self.used}/{self.daily_quota} units used)"
+                )
+            self.used += cost
+            self.used_by_endpoint[endpoint] = self.used_by_endpoint.get(endpoint, 0) + cost
+        record(api_calls=1, quota_units=cost)
+
+    def _acquire_token(self):
+        # Token bucket: refill at `rate` tokens per second up to `burst`, wait when empty
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def execute(self, endpoint, request, **kwargs):
+        attempt = 0
+        while True:
+            self._charge(endpoint)
+            self._acquire_token()
+            try:
+                return request.execute(**kwargs)
+            except HttpError as e:
+                reason = error_reason(e)
+                if reason == 'quotaExceeded':
+                    with self._lock:
+                        self.used = self.daily_quota
+                    raise QuotaExceededError(f"YouTube API quota exceeded: {e}") from e
+                status = e.resp.status
+                retryable = status >= 500 or status == 429 or (status == 403 and reason in RETRYABLE_REASONS)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            record(retries=1)
+            # Full jitter exponential backoff
+            time.sleep(random.uniform(0, self.base_delay * (2 ** attempt)))
+
+    def stats(self):
+        with self._lock:
+            self._roll_day()
+            return {
+                'used': self.used,
+                'remaining': self.daily_quota - self.used,
+                'retries': self.retries,
+                'by_endpoint': dict(self.used_by_endpoint),
+            }
+
+
+# A list() request whose execute() is routed through the scheduler
+class ScheduledRequest:
+    def __init__(self, scheduler, endpoint, request):
+        self.scheduler = scheduler
+        self.endpoint = endpoint
+        self.request = request
+
+    def execute(self, **kwargs):
+        return self.scheduler.execute(self.endpoint, self.request, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.request, name)
+
+
+# A resource collection whose list() requests are scheduled
+class ScheduledResource:
+    def __init__(self, scheduler, endpoint, resource):
+        self.scheduler = scheduler
+        self.endpoint = endpoint
+        self.resource = resource
+
+    def list(self, **params):
+        return ScheduledRequest(self.scheduler, self.endpoint, self.resource.list(**params))
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
+
+# Drop-in wrapper around build('youtube', 'v3') that sends every request through a QuotaScheduler
+class ScheduledYouTube:
+    def __init__(self, youtube, scheduler):
+        self.youtube = youtube
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attribute = getattr(self.youtube, name)
+        if name in ENDPOINT_COSTS:
+            return lambda: ScheduledResource(self.scheduler, name, attribute())
+        return attribute
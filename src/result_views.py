@@ -0,0 +1,177 @@
+import csv
+import hashlib
+import math
+import os
+import uuid
+from datetime import datetime
+
+import pymysql
+from pymysql.constants import FIELD_TYPE
+
+from harvester import cached_query, db_connection, logger
+
+# Rows shown per page in the paged result viewer
+PAGE_SIZE = 100
+# Rows fetched per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 10000
+# Directory exports are written to on the server
+EXPORT_DIR = 'exports'
+
+
+# A result set that can be paged with keyset (seek) pagination instead of OFFSET
+class KeysetView:
+    def __init__(self, select, key_column, sort_column=None, descending=False, where=None):
+        self.select = select
+        self.key_column = key_column
+        self.sort_column = sort_column
+        self.descending = descending
+        self.where = where
+
+    @staticmethod
+    def field(column):
+        # DataFrame column name of a possibly table-qualified SQL column
+        return column.split('.')[-1]
+
+    def order_by(self):
+        direction = 'DESC' if self.descending else 'ASC'
+        columns = [self.sort_column, self.key_column] if self.sort_column else [self.key_column]
+        return ', '.join(f"{column} {direction}" for column in columns)
+
+    def page_query(self, params=(), after=None, page_size=PAGE_SIZE):
+        conditions = [self.where] if self.where else []
+        params = list(params)
+        if after is not None:
+            sort_value, key_value = after
+            op = '<' if self.descending else '>'
+            if self.sort_column is None:
+                conditions.append(f"{self.key_column} {op} %s")
+                params.append(key_value)
+            elif sort_value is None:
+                # MySQL sorts NULLs last in descending order and first in ascending order
+                not_null_tail = "" if self.descending else f" OR {self.sort_column} IS NOT NULL"
+                conditions.append(f"(({self.sort_column} IS NULL AND {self.key_column} {op} %s){not_null_tail})")
+                params.append(key_value)
+            else:
+                null_tail = f" OR {self.sort_column} IS NULL" if self.descending else ""
+                conditions.append(
+                    f"({self.sort_column} {op} %s OR ({self.sort_column} = %s AND {self.key_column} {op} %s){null_tail})"
+                )
+                params.extend([sort_value, sort_value, key_value])
+        sql = self.select
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {self.order_by()} LIMIT {int(page_size)}"
+        return sql, tuple(params)
+
+    def export_query(self):
+        sql = self.select
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+
+# Function to convert a DataFrame cell back into a plain SQL parameter
+def sql_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+# Function to fetch one page of a view; returns the DataFrame, whether it was cached, and the cursor of the next page
+def fetch_page(view, user, password, params=(), after=None, page_size=PAGE_SIZE):
+    sql, sql_params = view.page_query(params, after, page_size)
+    df, warm = cached_query(sql, user, password, sql_params)
+    next_after = None
+    if len(df) == page_size:
+        last = df.iloc[-1]
+        sort_value = sql_value(last[view.field(view.sort_column)]) if view.sort_column else None
+        next_after = (sort_value, sql_value(last[view.field(view.key_column)]))
+    return df, warm, next_after
+
+
+# pyarrow type for each MySQL column type; anything unlisted is written as a string
+def arrow_type(type_code):
+    import pyarrow as pa
+    if type_code in (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG):
+        return pa.int64()
+    if type_code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL):
+        return pa.float64()
+    if type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        return pa.timestamp('s')
+    if type_code == FIELD_TYPE.DATE:
+        return pa.date32()
+    return pa.string()
+
+
+# Function to convert a list of MySQL rows into an Arrow table of the given schema
+def rows_to_table(rows, schema):
+    import pyarrow as pa
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if field.type == pa.float64():
+            # DECIMAL columns arrive as Decimal objects
+            values = [float(value) if value is not None else None for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# Function to stream a whole view to CSV or Parquet through an unbuffered server-side cursor
+def export_view(view, user, password, path, params=(), fmt='csv', chunk_size=EXPORT_CHUNK_SIZE):
+    with db_connection(user, password) as conn:
+        if conn is None:
+            return None
+        try:
+            # SSCursor reads rows from the socket as they are fetched instead of buffering the whole result
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(view.export_query(), params)
+                columns = [desc[0] for desc in cursor.description]
+                if fmt == 'parquet':
+                    return write_parquet(cursor, path, chunk_size)
+                return write_csv(cursor, columns, path, chunk_size)
+        except pymysql.MySQLError as e:
+            logger.error(f"Error exporting query: {e}")
+            return None
+
+
+# Function to write an open cursor to CSV chunk by chunk
+def write_csv(cursor, columns, path, chunk_size):
+    rows_written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            rows_written += len(rows)
+    return rows_written
+
+
+# Function to write an open cursor to a zstd-compressed Parquet file, one row group per chunk
+def write_parquet(cursor, path, chunk_size):
+    # pyarrow is only needed for Parquet exports
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([(desc[0], arrow_type(desc[1])) for desc in cursor.description])
+    rows_written = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.write_table(rows_to_table(rows, schema))
+            rows_written += len(rows)
+    return rows_written
+
+
+# Function to pick a new file path for an export of the given view. The name carries a hash of the query
+# parameters, so exports of different filters are told apart, and a unique suffix, so concurrent sessions
+# exporting the same view never write to the same file.
+def export_path(name, fmt, params=None):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    safe_name = ''.join(c if c.isalnum() else '_' for c in name).strip('_').lower()
+    params_hash = hashlib.sha1(repr(tuple(params or ())).encode('utf-8')).hexdigest()[:8]
+    suffix = f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+    return os.path.join(EXPORT_DIR, f"{safe_name}_{params_hash}_{suffix}.{fmt}")
@@ -0,0 +1,79 @@
+import re
+
+from harvester import cached_query, normalize_tag
+
+# Results shown per page of a search
+SEARCH_PAGE_SIZE = 20
+# InnoDB's default full-text stopwords and minimum token size; a required term that is never indexed matches nothing
+FULLTEXT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to was what when "
+    "where who will with und www".split()
+)
+FULLTEXT_MIN_TOKEN_SIZE = 3
+WORD_REGEX = re.compile(r"\w+")
+
+# Comments ranked by full-text relevance, optionally limited to one channel. Only CommentInfo has the
+# full-text index; comments moved to CommentArchive are not searched.
+COMMENT_SEARCH_QUERY = """
+SELECT CommentInfo.comment_id, CommentInfo.video_id, VideoInfo.channel_Name, CommentInfo.author,
+CommentInfo.comment_published_at, CommentInfo.like_count, CommentInfo.comment_text,
+MATCH(CommentInfo.comment_text) AGAINST (%s IN BOOLEAN MODE) AS relevance
+FROM CommentInfo JOIN VideoInfo ON VideoInfo.video_id = CommentInfo.video_id
+WHERE MATCH(CommentInfo.comment_text) AGAINST (%s IN BOOLEAN MODE) {channel_filter}
+ORDER BY relevance DESC, CommentInfo.comment_id
+LIMIT %s OFFSET %s
+"""
+# Videos ranked by full-text relevance of their description and tags
+VIDEO_SEARCH_QUERY = """
+SELECT VideoInfo.video_id, VideoInfo.channel_Name, VideoInfo.published_At, VideoInfo.view_count,
+VideoInfo.tags, VideoInfo.video_description,
+MATCH(VideoInfo.video_description, VideoInfo.tags) AGAINST (%s IN BOOLEAN MODE) AS relevance
+FROM VideoInfo
+WHERE MATCH(VideoInfo.video_description, VideoInfo.tags) AGAINST (%s IN BOOLEAN MODE) {channel_filter}
+ORDER BY relevance DESC, VideoInfo.video_id
+LIMIT %s OFFSET %s
+"""
+# Videos carrying a tag, found through the tag index of VideoTag, most viewed first
+TAG_SEARCH_QUERY = """
+SELECT VideoInfo.video_id, VideoInfo.channel_Name, VideoInfo.published_At, VideoInfo.view_count, VideoInfo.tags
+FROM VideoTag JOIN VideoInfo ON VideoInfo.video_id = VideoTag.video_id
+WHERE VideoTag.tag = %s {channel_filter}
+ORDER BY VideoInfo.view_count DESC, VideoInfo.video_id
+LIMIT %s OFFSET %s
+"""
+# What can be searched: scope shown in the app -> (query, whether the terms go through boolean_query,
+# column a channel filter applies to). Comments are filtered on their own channel, the leading column of
+# CommentInfo's primary key, rather than through the joined video.
+SEARCH_SCOPES = {
+    "Comments": (COMMENT_SEARCH_QUERY, True, "CommentInfo.channel_Id"),
+    "Videos": (VIDEO_SEARCH_QUERY, True, "VideoInfo.channel_Id"),
+    "Tag": (TAG_SEARCH_QUERY, False, "VideoInfo.channel_Id"),
+}
+
+
+# Function to turn free text into a boolean-mode query that requires every word, as a prefix;
+# returns None if no word can match
+def boolean_query(text):
+    words = [word.lower() for word in WORD_REGEX.findall(text)]
+    terms = [
+        f"+{word}*" for word in dict.fromkeys(words)
+        if len(word) >= FULLTEXT_MIN_TOKEN_SIZE and word not in FULLTEXT_STOPWORDS
+    ]
+    return " ".join(terms) or None
+
+
+# Function to run one page of a search; returns the DataFrame, whether it was cached, and whether a next page exists
+def search(scope, text, user, password, channel_id=None, page=0, page_size=SEARCH_PAGE_SIZE):
+    query, full_text, channel_column = SEARCH_SCOPES[scope]
+    term = boolean_query(text) if full_text else normalize_tag(text)
+    if not term:
+        return None, False, False
+    params = [term, term] if full_text else [term]
+    channel_filter = ""
+    if channel_id:
+        channel_filter = f"AND {channel_column} = %s"
+        params.append(channel_id)
+    # One row more than the page tells whether there is a next page without counting every match
+    params.extend([page_size + 1, page * page_size])
+    df, warm = cached_query(query.format(channel_filter=channel_filter), user, password, params)
+    return df.head(page_size), warm, len(df) > page_size
@@ -0,0 +1,159 @@
+from datetime import date, datetime
+
+from metrics import record
+
+# Counters whose history is kept, per table they are harvested into: (snapshot table, key column, counters)
+SNAPSHOTS = {
+    'ChannelInfo': ('ChannelStatsSnapshot', 'channel_Id', ('subscription_count', 'channel_views', 'Total_videos')),
+    'VideoInfo': ('VideoStatsSnapshot', 'video_id', ('view_count', 'like_count', 'comment_count')),
+}
+# Monthly partitions created ahead of the current month, so writes never land in the catch-all partition
+SNAPSHOT_MONTHS_AHEAD = 2
+
+
+# Function to create the snapshot tables, partitioned by capture time with a single catch-all partition to begin with
+def create_snapshot_tables(cursor):
+    for table, key_column, counters in SNAPSHOTS.values():
+        # The primary key leads with the key column, so the history of one video or channel is one range read
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {key_column} VARCHAR(64) NOT NULL,
+            captured_At DATETIME NOT NULL,
+            {', '.join(f'{counter} BIGINT' for counter in counters)},
+            PRIMARY KEY ({key_column}, captured_At)
+        )
+        PARTITION BY RANGE COLUMNS (captured_At) (PARTITION p_future VALUES LESS THAN (MAXVALUE))
+        """)
+
+
+# Function to get the first day of the month `months` after the month of `day`
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+# Function to split monthly partitions off the catch-all partition up to SNAPSHOT_MONTHS_AHEAD months ahead
+def add_snapshot_partitions(cursor, today=None, months_ahead=SNAPSHOT_MONTHS_AHEAD):
+    today = today or date.today()
+    for table, _, _ in SNAPSHOTS.values():
+        cursor.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s
+        """, (table,))
+        existing = {row[0] for row in cursor.fetchall()}
+        months = [add_months(today, offset) for offset in range(months_ahead + 1)]
+        missing = [month for month in months if f"p{month:%Y%m}" not in existing]
+        if not missing:
+            continue
+        # Rows already in p_future move to the new partitions that cover them
+        partitions = [
+            f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')" for month in missing
+        ]
+        partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({', '.join(partitions)})")
+
+
+# Function to make the snapshot rows of a batch: (key, captured_At, *counters) for every row whose counters
+# differ from the stored ones. `existing` maps keys to their stored counters; new keys always get a snapshot.
+def changed_counters(table, columns, rows, existing, captured_at=None):
+    _, key_column, counters = SNAPSHOTS[table]
+    captured_at = (captured_at or datetime.now()).replace(microsecond=0)
+    key_index = columns.index(key_column)
+    counter_indexes = [columns.index(counter) for counter in counters]
+    snapshot_rows = []
+    for row in rows:
+        # The API sends counters as strings; MySQL stores them as integers
+        values = tuple(None if row[index] is None else int(row[index]) for index in counter_indexes)
+        if existing.get(row[key_index]) != values:
+            snapshot_rows.append((row[key_index], captured_at, *values))
+    return snapshot_rows
+
+
+# Function to read the latest snapshot counters of some keys in one round trip; returns {key: (counters...)}
+def latest_snapshots(conn, table, keys):
+    if not keys:
+        return {}
+    snapshot_table, key_column, counters = SNAPSHOTS[table]
+    placeholders = ', '.join(['%s'] * len(keys))
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+        SELECT snapshot.{key_column}, {', '.join(f'snapshot.{counter}' for counter in counters)}
+        FROM {snapshot_table} AS snapshot
+        JOIN (
+            SELECT {key_column}, MAX(captured_At) AS captured_At FROM {snapshot_table}
+            WHERE {key_column} IN ({placeholders}) GROUP BY {key_column}
+        ) AS latest ON snapshot.{key_column} = latest.{key_column} AND snapshot.captured_At = latest.captured_At
+        """, keys)
+        rows = cursor.fetchall()
+    record(db_round_trips=1)
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+# Function to append snapshot rows, without committing, so they are committed with the rows they describe.
+# A second change of the same key within the same second replaces the first.
+def write_snapshots(conn, table, snapshot_rows):
+    snapshot_table, key_column, counters = SNAPSHOTS[table]
+    columns = [key_column, 'captured_At', *counters]
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"REPLACE INTO {snapshot_table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            snapshot_rows
+        )
+    record(db_round_trips=1)
+
+
+# Videos that gained the most views over the last N days. The baseline of a video is its last snapshot before
+# the window, or its first one inside it; videos without a snapshot in the window did not change and are left out.
+# The current values are read from VideoInfo, which always matches the latest snapshot.
+TOP_GAINERS_QUERY = """
+SELECT VideoInfo.video_id, VideoInfo.channel_Name, base.captured_At AS baseline_At,
+snapshot.view_count AS views_start, VideoInfo.view_count AS views_now,
+VideoInfo.view_count - snapshot.view_count AS views_gained,
+ROUND((VideoInfo.view_count - snapshot.view_count) * 86400
+    / NULLIF(TIMESTAMPDIFF(SECOND, GREATEST(base.captured_At, NOW() - INTERVAL %s DAY), NOW()), 0), 1)
+    AS views_per_day,
+VideoInfo.like_count - snapshot.like_count AS likes_gained,
+VideoInfo.comment_count - snapshot.comment_count AS comments_gained
+FROM (
+    SELECT video_id,
+    COALESCE(MAX(CASE WHEN captured_At <= NOW() - INTERVAL %s DAY THEN captured_At END), MIN(captured_At))
+        AS captured_At
+    FROM VideoStatsSnapshot
+    WHERE video_id IN (SELECT video_id FROM VideoStatsSnapshot WHERE captured_At > NOW() - INTERVAL %s DAY)
+    GROUP BY video_id
+) AS base
+JOIN VideoStatsSnapshot AS snapshot ON snapshot.video_id = base.video_id AND snapshot.captured_At = base.captured_At
+JOIN VideoInfo ON VideoInfo.video_id = base.video_id
+ORDER BY views_gained DESC
+LIMIT %s
+"""
+# Subscriber and view growth of every channel that changed over the last N days, with the same baseline rule
+CHANNEL_GROWTH_QUERY = """
+SELECT ChannelInfo.channel_Id, ChannelInfo.channel_Name, base.captured_At AS baseline_At,
+snapshot.subscription_count AS subscribers_start, ChannelInfo.subscription_count AS subscribers_now,
+ChannelInfo.subscription_count - snapshot.subscription_count AS subscribers_gained,
+ROUND((ChannelInfo.subscription_count - snapshot.subscription_count) * 86400
+    / NULLIF(TIMESTAMPDIFF(SECOND, GREATEST(base.captured_At, NOW() - INTERVAL %s DAY), NOW()), 0), 1)
+    AS subscribers_per_day,
+ROUND(100 * (ChannelInfo.subscription_count - snapshot.subscription_count)
+    / NULLIF(snapshot.subscription_count, 0), 2) AS subscribers_growth_pct,
+ChannelInfo.channel_views - snapshot.channel_views AS views_gained,
+ChannelInfo.Total_videos - snapshot.Total_videos AS videos_added
+FROM (
+    SELECT channel_Id,
+    COALESCE(MAX(CASE WHEN captured_At <= NOW() - INTERVAL %s DAY THEN captured_At END), MIN(captured_At))
+        AS captured_At
+    FROM ChannelStatsSnapshot
+    WHERE channel_Id IN (SELECT channel_Id FROM ChannelStatsSnapshot WHERE captured_At > NOW() - INTERVAL %s DAY)
+    GROUP BY channel_Id
+) AS base
+JOIN ChannelStatsSnapshot AS snapshot
+ON snapshot.channel_Id = base.channel_Id AND snapshot.captured_At = base.captured_At
+JOIN ChannelInfo ON ChannelInfo.channel_Id = base.channel_Id
+ORDER BY subscribers_gained DESC
+"""
+
+
+# Function to get the parameters of a growth query for a window of `days` (and a row limit for the top gainers)
+def growth_params(days, limit=None):
+    return (days, days, days) if limit is None else (days, days, days, limit)
@@ -0,0 +1,172 @@
+import logging
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Child of the harvester logger so warnings reach the same handlers
+logger = logging.getLogger('harvester.transform')
+
+# Timestamps as returned by the API, e.g. 2023-05-01T12:00:00Z or 2023-05-01T12:00:00.123Z
+ISO_TIMESTAMP_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z$'
+# ISO 8601 durations as returned by the API, e.g. PT4M13S, PT1H2M, P1DT2H, P0D
+DURATION_PATTERN = r'^P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$'
+DURATION_REGEX = re.compile(DURATION_PATTERN)
+
+
+# Function to convert one ISO 8601 duration to whole seconds; returns None if it is not a duration
+def duration_to_seconds(iso_duration):
+    match = DURATION_REGEX.match(iso_duration or '')
+    # A bare "P" or "PT" matches the pattern but carries no duration
+    if not match or not any(match.groups()):
+        return None
+    weeks, days, hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return (((weeks * 7 + days) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+# Function to format whole seconds as HH:MM:SS
+def format_seconds(total):
+    if total is None:
+        return None
+    hours, remainder = divmod(total, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+# Columns of the record batches the video fetch stage emits; counters are parsed to integers as they arrive
+VIDEO_BATCH_SCHEMA = pa.schema([
+    ('video_id', pa.string()),
+    ('channel_Name', pa.string()),
+    ('channel_Id', pa.string()),
+    ('video_description', pa.string()),
+    ('tags', pa.list_(pa.string())),
+    ('published_At', pa.string()),
+    ('view_count', pa.int64()),
+    ('like_count', pa.int64()),
+    ('dislike_count', pa.int64()),
+    ('favorite_count', pa.int64()),
+    ('comment_count', pa.int64()),
+    ('duration', pa.string()),
+    ('thumbnail', pa.string()),
+    ('caption_status', pa.string()),
+])
+# Columns of the record batches the comment fetch stage emits
+COMMENT_BATCH_SCHEMA = pa.schema([
+    ('comment_id', pa.string()),
+    ('video_id', pa.string()),
+    ('author', pa.string()),
+    ('comment_published_at', pa.string()),
+    ('comment_text', pa.string()),
+    ('like_count', pa.int64()),
+    ('viewer_rating', pa.string()),
+    ('comment_updated_at', pa.string()),
+])
+
+
+# Function to pack one API page of records (dicts) into a record batch; the dicts can be dropped right after
+def to_record_batch(records, schema):
+    return pa.RecordBatch.from_pylist(records, schema=schema)
+
+
+# Function to regroup a stream of record batches (or a table) into tables of `size` rows, without copying
+def rebatch(batches, size):
+    if isinstance(batches, pa.Table):
+        batches = batches.to_batches()
+    pending = []
+    rows = 0
+    for batch in batches:
+        if batch.num_rows == 0:
+            continue
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, size)
+            rest = table.slice(size)
+            pending = rest.to_batches()
+            rows = rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+
+# Function to get a column as one Arrow array of the given type, from a list, an Array or a ChunkedArray
+def as_array(values, value_type):
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    if isinstance(values, pa.Array):
+        return values if values.type == value_type else values.cast(value_type)
+    return pa.array(values, type=value_type)
+
+
+# Function to apply a scalar function once per distinct value of a column and broadcast the results
+def map_distinct(values, function, value_type, result_type):
+    # Durations repeat heavily within a batch, so dictionary-encoding leaves few values to parse
+    encoded = as_array(values, value_type).dictionary_encode()
+    results = pa.array([function(value) for value in encoded.dictionary.to_pylist()], type=result_type)
+    return pc.take(results, encoded.indices)
+
+
+# Function to parse a column of ISO 8601 timestamps into MySQL DATETIME strings; invalid values become None
+def parse_iso_dates(values):
+    array = as_array(values, pa.string())
+    valid = pc.fill_null(pc.match_substring_regex(array, ISO_TIMESTAMP_PATTERN), False)
+    failed = len(array) - array.null_count - pc.sum(valid).as_py() if len(array) else 0
+    if failed:
+        logger.warning(f"{failed} timestamp(s) could not be parsed and were stored as NULL")
+    text = pc.binary_join_element_wise(
+        pc.utf8_slice_codeunits(array, 0, 10), pc.utf8_slice_codeunits(array, 11, 19), ' '
+    )
+    return pc.if_else(valid, text, pa.scalar(None, pa.string()))
+
+
+# Function to parse a column of ISO 8601 durations into whole seconds; invalid values become None
+def parse_durations(values):
+    durations = as_array(values, pa.string())
+    seconds = map_distinct(durations, duration_to_seconds, pa.string(), pa.int64())
+    failed = len(durations) - durations.null_count - (len(seconds) - seconds.null_count)
+    if failed:
+        logger.warning(f"{failed} duration(s) could not be parsed and were stored as NULL")
+    return seconds
+
+
+# Function to format a column of whole seconds as HH:MM:SS for the legacy duration column
+def format_durations(seconds):
+    return map_distinct(seconds, format_seconds, pa.int64(), pa.string())
+
+
+# Function to pull the given fields of a batch of dicts out as one list per column
+def to_columns(records, fields):
+    return {field: [record[field] for record in records] for field in fields}
+
+
+# Function to zip columns (lists or Arrow arrays) into row tuples in the given column order, ready for executemany
+def to_rows(columns, order):
+    return list(zip(*(
+        columns[name].to_pylist() if isinstance(columns[name], (pa.Array, pa.ChunkedArray)) else columns[name]
+        for name in order
+    )))
+
+
+# Function to transform a record batch or table of videos (VIDEO_BATCH_SCHEMA) into VideoInfo rows
+def transform_videos(batch, columns):
+    data = {column: batch.column(column) for column in columns if column != 'duration_seconds'}
+    data['tags'] = pc.binary_join(data['tags'], ',')
+    data['published_At'] = parse_iso_dates(data['published_At'])
+    data['duration_seconds'] = parse_durations(data['duration'])
+    data['duration'] = format_durations(data['duration_seconds'])
+    return to_rows(data, columns)
+
+
+# Function to transform a record batch or table of comments (COMMENT_BATCH_SCHEMA) into CommentInfo rows
+def transform_comments(batch, columns):
+    data = {column: batch.column(column) for column in columns}
+    data['comment_published_at'] = parse_iso_dates(data['comment_published_at'])
+    data['comment_updated_at'] = parse_iso_dates(data['comment_updated_at'])
+    return to_rows(data, columns)
+
+
+# Function to transform a batch of playlist dicts into PlaylistDetails rows
+def transform_playlists(playlist_data, columns):
+    data = to_columns(playlist_data, columns)
+    data['PublishedAt'] = parse_iso_dates(data['PublishedAt'])
+    return to_rows(data, columns)
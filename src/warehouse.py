@@ -0,0 +1,291 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from itertools import groupby
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pymysql
+
+from harvester import REFRESH_WINDOW_DAYS, db_connection, logger
+from result_views import arrow_type, rows_to_table
+from transform import format_seconds
+
+# Root directory of the Parquet warehouse
+WAREHOUSE_DIR = 'warehouse'
+# Rows fetched per round trip while syncing a channel
+WAREHOUSE_CHUNK_SIZE = 10000
+# Partition of rows without a publish date
+UNKNOWN_MONTH = 'unknown'
+# File recording when each channel was last synced
+SYNC_STATE_FILE = '_sync_state.json'
+# Tables mirrored into the warehouse. Datasets with a date column are partitioned by channel and
+# publish month; incremental ones only rewrite the months a harvest can have changed.
+WAREHOUSE_DATASETS = {
+    'channels': {
+        'select': "SELECT * FROM ChannelInfo WHERE channel_Id = %s",
+        'date_column': None,
+        'incremental': False,
+    },
+    'playlists': {
+        'select': "SELECT * FROM PlaylistDetails WHERE Channel_Id = %s",
+        'date_column': 'PublishedAt',
+        # Playlist video counts change on every harvest, and there are few playlists
+        'incremental': False,
+    },
+    'videos': {
+        'select': "SELECT * FROM VideoInfo WHERE channel_Id = %s",
+        'date_column': 'published_At',
+        'incremental': True,
+    },
+    'comments': {
+        # Live and archived comments alike; the channel filter reaches both tables' channel-first keys
+        'select': "SELECT * FROM CommentAll WHERE channel_Id = %s",
+        'date_column': 'comment_published_at',
+        'incremental': True,
+    },
+}
+
+
+# Function to get the directory of a dataset
+def dataset_dir(name, root=WAREHOUSE_DIR):
+    return os.path.join(root, name)
+
+
+# Function to read the last sync time of every channel
+def read_sync_state(root=WAREHOUSE_DIR):
+    try:
+        with open(os.path.join(root, SYNC_STATE_FILE), encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+_sync_state_lock = threading.Lock()
+
+
+# Function to record the last sync time of a channel
+def write_sync_state(root, channel_id, synced_at):
+    # Channels harvested in parallel finish their syncs concurrently
+    with _sync_state_lock:
+        state = read_sync_state(root)
+        state[channel_id] = synced_at.isoformat(timespec='seconds')
+        temporary_path = os.path.join(root, SYNC_STATE_FILE + '.tmp')
+        with open(temporary_path, 'w', encoding='utf-8') as handle:
+            json.dump(state, handle, indent=2)
+        os.replace(temporary_path, os.path.join(root, SYNC_STATE_FILE))
+
+
+# Function to pick the first day of the oldest month an incremental harvest can have changed
+def incremental_since(last_synced_at, refresh_days=REFRESH_WINDOW_DAYS):
+    since = datetime.now() - timedelta(days=refresh_days)
+    if last_synced_at is not None:
+        since = min(since, datetime.fromisoformat(last_synced_at))
+    # Whole months are rewritten, so start at the beginning of the month
+    return since.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+# Function to stream one channel's rows of a dataset into staged Parquet files, one file per month;
+# returns the number of rows written
+def stage_dataset(conn, name, channel_id, staging_dir, since=None, chunk_size=WAREHOUSE_CHUNK_SIZE):
+    dataset = WAREHOUSE_DATASETS[name]
+    date_column = dataset['date_column']
+    sql, params = dataset['select'], [channel_id]
+    if date_column and since is not None:
+        sql += f" AND {date_column} >= %s"
+        params.append(since)
+    if date_column:
+        # Rows arrive grouped by month, so only one month's writer is open at a time
+        sql += f" ORDER BY {date_column}"
+    rows_written = 0
+    writer = None
+    current_month = None
+    # SSCursor streams the channel instead of buffering it in memory
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(sql, params)
+        schema = pa.schema([(desc[0], arrow_type(desc[1])) for desc in cursor.description])
+        date_index = schema.get_field_index(date_column.split('.')[-1]) if date_column else None
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if date_index is None:
+                    groups = [(None, rows)]
+                else:
+                    groups = groupby(rows, key=lambda row: row[date_index].strftime('%Y-%m')
+                                     if row[date_index] is not None else UNKNOWN_MONTH)
+                for month, group in groups:
+                    if writer is None or month != current_month:
+                        if writer is not None:
+                            writer.close()
+                        directory = staging_dir if month is None else os.path.join(staging_dir, f"publish_month={month}")
+                        os.makedirs(directory, exist_ok=True)
+                        writer = pq.ParquetWriter(os.path.join(directory, 'part-0.parquet'), schema, compression='zstd')
+                        current_month = month
+                    table = rows_to_table(list(group), schema)
+                    writer.write_table(table)
+                    rows_written += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows_written
+
+
+# Function to swap staged partitions into a channel's directory of a dataset
+def replace_partitions(staging_dir, channel_dir, first_month=None):
+    os.makedirs(channel_dir, exist_ok=True)
+    staged = set(os.listdir(staging_dir)) if os.path.isdir(staging_dir) else set()
+    for entry in os.listdir(channel_dir):
+        month = entry.split('=', 1)[1] if entry.startswith('publish_month=') else None
+        # Partitions older than the synced range (and rows without a date) are kept as they are
+        if first_month is not None and (month is None or month == UNKNOWN_MONTH or month < first_month):
+            continue
+        if entry not in staged:
+            path = os.path.join(channel_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+    for entry in staged:
+        target = os.path.join(channel_dir, entry)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(os.path.join(staging_dir, entry), target)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+# Function to sync one channel from MySQL into the warehouse; returns rows written per dataset, or None on failure
+def sync_channel(user, password, channel_id, full=False, root=WAREHOUSE_DIR):
+    synced_at = datetime.now()
+    last_synced_at = None if full else read_sync_state(root).get(channel_id)
+    since = incremental_since(last_synced_at) if last_synced_at is not None else None
+    rows_written = {}
+    with db_connection(user, password) as conn:
+        if conn is None:
+            return None
+        try:
+            for name, dataset in WAREHOUSE_DATASETS.items():
+                dataset_since = since if dataset['incremental'] else None
+                # Staged outside the dataset directory so readers never see half-written partitions
+                staging_dir = os.path.join(root, '_staging', name, f"channel={channel_id}")
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                rows_written[name] = stage_dataset(conn, name, channel_id, staging_dir, dataset_since)
+                channel_dir = os.path.join(dataset_dir(name, root), f"channel={channel_id}")
+                first_month = dataset_since.strftime('%Y-%m') if dataset_since is not None else None
+                replace_partitions(staging_dir, channel_dir, first_month)
+            write_sync_state(root, channel_id, synced_at)
+        except (pymysql.MySQLError, OSError, pa.ArrowException) as e:
+            logger.error(f"Error syncing channel {channel_id} to the Parquet warehouse: {e}")
+            return None
+    scope = 'fully' if since is None else f"from {since:%Y-%m}"
+    logger.info(f"Parquet warehouse synced {scope} for channel {channel_id}: "
+                + ", ".join(f"{rows} {name}" for name, rows in rows_written.items()))
+    return rows_written
+
+
+# Function to read a dataset with column projection and partition/row-group filters pushed down
+def read_dataset(name, columns=None, filter=None, root=WAREHOUSE_DIR):
+    path = dataset_dir(name, root)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns)
+    fields = [('channel', pa.string())]
+    if WAREHOUSE_DATASETS[name]['date_column']:
+        fields.append(('publish_month', pa.string()))
+    partitioning = ds.partitioning(pa.schema(fields), flavor='hive')
+    dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+
+# Video columns without the wide TEXT columns, for queries that only need counters
+VIDEO_COUNTER_COLUMNS = ['video_id', 'channel_Name', 'channel_Id', 'published_At', 'view_count', 'like_count',
+                         'dislike_count', 'favorite_count', 'comment_count', 'duration', 'duration_seconds']
+
+
+# Function to join channel details with a per-channel aggregate of one video column
+def channels_with(column, aggregate, result_name):
+    channels = read_dataset('channels').drop(columns=['channel'])
+    videos = read_dataset('videos', columns=['channel_Id', column])
+    totals = videos.groupby('channel_Id')[column].agg(aggregate).rename(result_name)
+    return channels.merge(totals, left_on='channel_Id', right_index=True)
+
+
+def query_all_videos():
+    return read_dataset('videos').drop(columns=['channel', 'publish_month'])
+
+
+def query_channels_with_most_videos():
+    return channels_with('video_id', 'count', 'video_count').sort_values('video_count', ascending=False)
+
+
+def query_top_viewed_videos():
+    return read_dataset('videos', columns=VIDEO_COUNTER_COLUMNS).nlargest(10, 'view_count')
+
+
+def query_most_commented_videos():
+    return read_dataset('videos', columns=VIDEO_COUNTER_COLUMNS).sort_values('comment_count', ascending=False)
+
+
+def query_most_liked_videos():
+    return read_dataset('videos', columns=VIDEO_COUNTER_COLUMNS).sort_values('like_count', ascending=False)
+
+
+def query_likes_and_dislikes():
+    videos = read_dataset('videos', columns=VIDEO_COUNTER_COLUMNS)
+    videos['total_likes_dislikes'] = videos['like_count'] + videos['dislike_count']
+    return videos
+
+
+def query_channel_views():
+    return channels_with('view_count', 'sum', 'total_views')
+
+
+def query_videos_published_2022():
+    # The publish_month partitions outside 2022 are never opened
+    in_2022 = (ds.field('publish_month') >= '2022-01') & (ds.field('publish_month') <= '2022-12')
+    videos = read_dataset('videos', columns=['channel_Name', 'published_At'], filter=in_2022)
+    return videos.rename(columns={'channel_Name': 'channel_name'}).drop_duplicates()
+
+
+def query_average_duration():
+    videos = read_dataset('videos', columns=['channel_Name', 'duration_seconds'])
+    average = videos.groupby('channel_Name')['duration_seconds'].mean()
+    # A channel whose videos all lack a duration averages to NaN
+    durations = average.map(lambda seconds: None if pd.isna(seconds) else format_seconds(round(seconds)))
+    return pd.DataFrame({'channel_name': average.index, 'average_duration': durations.values})
+
+
+def query_highest_comments():
+    videos = read_dataset('videos', columns=['video_id', 'channel_Name', 'comment_count'])
+    return videos.sort_values('comment_count', ascending=False)
+
+
+# The ten sidebar queries, answered from the Parquet warehouse instead of MySQL
+WAREHOUSE_QUERIES = {
+    "All details of all videos": query_all_videos,
+    "Channels with most videos": query_channels_with_most_videos,
+    "Top 10 most viewed videos": query_top_viewed_videos,
+    "Videos with most comments": query_most_commented_videos,
+    "Videos with highest likes": query_most_liked_videos,
+    "Total likes and dislikes for each video": query_likes_and_dislikes,
+    "Total views for each channel": query_channel_views,
+    "Channels with videos published in 2022": query_videos_published_2022,
+    "Average duration of videos in each channel": query_average_duration,
+    "Videos with highest comments": query_highest_comments,
+}
+
+
+# Function to run one of the sidebar queries on the warehouse; returns None if the warehouse cannot be read
+def run_warehouse_query(name):
+    # Every query reads the videos dataset, which only exists once a channel has been synced
+    if not os.path.isdir(dataset_dir('videos')):
+        return pd.DataFrame()
+    try:
+        return WAREHOUSE_QUERIES[name]().reset_index(drop=True)
+    except (OSError, pa.ArrowException) as e:
+        logger.error(f"Error querying the Parquet warehouse: {e}")
+        return None
@@ -1,446 +1,172 @@
+import json
+import logging
 import streamlit as st
-from googleapiclient.discovery import build
-import pymysql
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-from datetime import datetime
-import re
-import matplotlib.pyplot as plt
-
-def parse_iso_date(date_str):
-    """Parses ISO 8601 date strings with or without fractional seconds."""
-    try:
-        # Try processing with fractional seconds first
-        return datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S.%fZ').strftime('%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        try:
-            # Fallback to standard format
-            return datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ').strftime('%Y-%m-%d %H:%M:%S')
-        except ValueError:
-             # Return original string or handle failure as needed if both fail (though unlikely for this API)
-             return date_str
-
-# Function to establish MySQL connection
-def mysql_connection(user, password):
-
-    try:
-        connection = pymysql.connect(
-            host='localhost',
-            user=user,
-            password=password,
-            db='bharath',
-            charset='utf8mb4',
-
+import harvester
+from charts import VIDEO_CHART_MODES, render_video_chart
+from harvester import (
+    check_channel_id,
+    create_tables,
+    db_connection,
+    cached_query,
+    data_version,
+    get_channel_info,
+    get_quota_scheduler,
+    youtube_client,
+)
+from jobs import JOB_PROGRESS_INTERVAL, get_job_runner, list_jobs
+from metrics import METRICS_JSONL_PATH, METRICS_PROM_PATH
+from quota import estimate_channel_cost
+from result_views import KeysetView, export_path, export_view, fetch_page
+from search import SEARCH_SCOPES, search
+from snapshots import CHANNEL_GROWTH_QUERY, TOP_GAINERS_QUERY, growth_params
+from warehouse import WAREHOUSE_QUERIES, run_warehouse_query
+
+# Shows harvester log records in the page of the session that triggered them
+class StreamlitLogHandler(logging.Handler):
+    def emit(self, record):
+        # Harvest jobs log from worker threads that belong to no session; their errors are kept in HarvestJob
+        if get_script_run_ctx() is None:
+            return
+        message = self.format(record)
+        if record.levelno >= logging.ERROR:
+            st.error(message)
+        elif record.levelno >= logging.WARNING:
+            st.warning(message)
+        else:
+            st.caption(message)
+# Install the handler once per server process rather than on every rerun
+@st.cache_resource(show_spinner=False)
+def install_log_handler():
+    handler = StreamlitLogHandler()
+    harvester.logger.addHandler(handler)
+    harvester.logger.setLevel(logging.INFO)
+    return handler
+install_log_handler()
+
+# Function to describe whether a query result came from the result cache
+def cache_status(warm):
+    return "Served warm from the query cache" if warm else "Served cold from MySQL"
+# Function to show the per-stage timings and counters of a harvest run (RunMetrics.as_dict())
+def show_run_report(report):
+    st.subheader(f"Run report ({report['mode']}, {report['status']}, {report['seconds']:.1f}s)")
+    if report['stages']:
+        st.dataframe(pd.DataFrame(report['stages']).set_index('stage'))
+    totals = report['totals']
+    st.caption(
+        f"{totals['api_calls']} API calls ({totals['quota_units']} quota units, {totals['retries']} retries, "
+        f"{totals['cache_hits']} cache hits), {totals['rows_written']} rows in {totals['db_round_trips']} "
+        f"DB round trips, {totals.get('rows_skipped', 0)} unchanged rows skipped. Metrics written to {METRICS_JSONL_PATH} and {METRICS_PROM_PATH}."
+    )
+    # Older reports, saved before the cache counters were kept per run, lack them
+    if 'cache_misses' in totals:
+        st.caption(
+            f"API cache this run: {totals['cache_hits']} hits ({totals['cache_revalidated']} revalidated), "
+            f"{totals['cache_misses']} misses, {totals['cache_bytes_saved'] / 1024:,.1f} KiB saved"
         )
-        return connection
-    except pymysql.MySQLError as e:
-        st.error(f"Error connecting to MySQL:{e}")
-        return None
-# Function to create SQL tables
-def create_tables(conn):
-
-    try:
-        with conn.cursor() as cursor:
-            # Create a table for channel info
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ChannelInfo (
-                channel_Id VARCHAR(255) PRIMARY KEY,
-                channel_Name VARCHAR(255),
-                subscription_count INT,
-                channel_views INT,
-                Total_videos INT,
-                channel_description TEXT,
-                playlist_id VARCHAR(255)
-            )
-            """)
-            # Create a table for playlist details
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS PlaylistDetails (
-                Playlist_Id VARCHAR(255) PRIMARY KEY,
-                Title VARCHAR(255),
-                Channel_Id VARCHAR(255),
-                Channel_Name VARCHAR(255),
-                PublishedAt DATETIME,
-                Video_count INT
-            )
-            """)
-            # Create a table for video info
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS VideoInfo (
-                video_id VARCHAR(255) PRIMARY KEY,
-                channel_Name VARCHAR(255),
-                channel_Id VARCHAR(255),
-                video_description TEXT,
-                tags TEXT,
-                published_At DATETIME,
-                view_count INT,
-                like_count INT,
-                dislike_count INT,
-                favorite_count INT,
-                comment_count INT,
-                duration VARCHAR(255),
-                thumbnail VARCHAR(255),
-                caption_status VARCHAR(255)
-            )
-            """)
-            # Create a table for comment info
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS CommentInfo (
-                comment_id VARCHAR(255) PRIMARY KEY,
-                video_id VARCHAR(255),
-                author VARCHAR(255),
-                comment_published_at DATETIME,
-                comment_text TEXT,
-                like_count INT,
-                viewer_rating VARCHAR(255),
-                comment_updated_at DATETIME
-            )
-            """)
-        conn.commit()
-    except pymysql.MySQLError as e:
-        st.error(f"Error creating tables: {e}")
-def clear_existing_data(conn, channel_id):
-
-    try:
-        with conn.cursor() as cursor:
-            # Deleting from CommentInfo first due to foreign key dependency on VideoInfo
-            cursor.execute("DELETE FROM CommentInfo WHERE video_id IN (SELECT video_id FROM VideoInfo WHERE channel_Id = %s)", (channel_id,))
-            # Deleting from VideoInfo next
-            cursor.execute("DELETE FROM VideoInfo WHERE channel_Id = %s", (channel_id,))
-            # Deleting from PlaylistDetails next
-            cursor.execute("DELETE FROM PlaylistDetails WHERE channel_Id = %s", (channel_id,))
-            # Deleting from ChannelInfo last
-            cursor.execute("DELETE FROM ChannelInfo WHERE channel_Id = %s", (channel_id,))
-        conn.commit()
-    except pymysql.MySQLError as e:
-        st.error(f"Error clearing existing data from MySQL: {e}")
-# Function to migrate data from YouTube to MySQL tables
-def migrate_data_to_sql(youtube, conn, channel_id):
-    try:
-        # Collect and insert channel details
-        channel_info = get_channel_info(youtube, channel_id)
-        insert_channel_info(conn, channel_info)
-        # Collect and insert playlist details
-        playlist_details = get_playlist_details(youtube, channel_id)
-        insert_playlist_details(conn, playlist_details)
-        # Collect and insert video details
-        video_ids = get_videos_ids(youtube, channel_id)
-        video_details = get_video_info(youtube, video_ids)
-        insert_video_info(conn, video_details)
-        # Collect and insert comment details
-        comment_details = get_comment_info(youtube, video_ids)
-        insert_comment_info(conn, comment_details)
-        st.success("Data migration to SQL completed successfully!")
-    except Exception as e:
-        st.error(f"Error migrating data to SQL: {e}")
-# Function to get channel information
-def get_channel_info(youtube, channel_id):
-    try:
-        request = youtube.channels().list(
-            part="snippet,statistics,contentDetails",
-            id=channel_id
+# Function to show the recent harvest jobs with live counters; polls while one of them is queued or running
+def show_jobs_panel(user, password, api_key):
+    jobs = list_jobs(user, password, limit=10)
+    if jobs is None or jobs.empty:
+        return
+    runner = get_job_runner(user, password)
+    st.subheader("Harvest Jobs")
+    rows = []
+    reports = {}
+    for job in jobs.itertuples(index=False):
+        run = runner.progress(job.job_id)
+        # Jobs running in this process report live; the others show their last saved progress
+        report = run.as_dict() if run is not None else json.loads(job.progress) if job.progress else None
+        reports[job.job_id] = report
+        totals = report['totals'] if report else {}
+        rows.append({
+            'job': job.job_id,
+            'channel': job.channel_Id,
+            'mode': job.mode,
+            'status': job.status,
+            'stage': run.current.name if run is not None and run.current is not None else None,
+            'API calls': totals.get('api_calls'),
+            'quota units': totals.get('quota_units'),
+            'rows written': totals.get('rows_written', job.rows_written),
+            'created': job.created_At,
+            'error': job.error,
+        })
+    st.dataframe(pd.DataFrame(rows).set_index('job'))
+    latest = jobs.iloc[0]
+    if reports[latest['job_id']]:
+        with st.expander(f"Job #{latest['job_id']} run report", expanded=latest['status'] != 'running'):
+            show_run_report(reports[latest['job_id']])
+    if api_key:
+        quota_stats = get_quota_scheduler(api_key).stats()
+        st.caption(
+            f"API quota: {quota_stats['used']} units used today, {quota_stats['remaining']} remaining, "
+            f"{quota_stats['retries']} retries"
         )
-        response = request.execute()
-        channel_info = {
-            'channel_Id': response['items'][0]['id'],
-            'channel_Name': response['items'][0]['snippet']['title'],
-            'subscription_count': int(response['items'][0]['statistics']['subscriberCount']),
-            'channel_views': int(response['items'][0]['statistics']['viewCount']),
-            'Total_videos': int(response['items'][0]['statistics']['videoCount']),
-            'channel_description': response['items'][0]['snippet']['description'],
-            'playlist_id': response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        }
-        return channel_info
-    except Exception as e:
-        st.error(f"Error fetching channel info: {e}")
-        return None
-# Function to insert channel information into MySQL
-def insert_channel_info(conn, channel_data):
-    try:
-        with conn.cursor() as cursor:
-            sql = """
-            INSERT INTO ChannelInfo (channel_Id, channel_Name, subscription_count, channel_views, 
-            Total_videos, channel_description, playlist_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            channel_Name=VALUES(channel_Name),
-            subscription_count=VALUES(subscription_count),
-            channel_views=VALUES(channel_views),
-            Total_videos=VALUES(Total_videos),
-            channel_description=VALUES(channel_description),
-            playlist_id=VALUES(playlist_id)
-            """
-            cursor.execute(sql, (
-                channel_data['channel_Id'],
-                channel_data['channel_Name'],
-                channel_data['subscription_count'],
-                channel_data['channel_views'],
-                channel_data['Total_videos'],
-                channel_data['channel_description'],
-                channel_data['playlist_id']
-            ))
-        conn.commit()
-    except pymysql.MySQLError as e:
-        st.error(f"Error inserting channel info into MySQL: {e}")
-# Function to get playlist details
-def get_playlist_details(youtube, channel_id):
-    try:
-        next_page_token = None
-        all_data = []
-        while True:
-            request = youtube.playlists().list(
-                part='snippet,contentDetails',
-                channelId=channel_id,
-                maxResults=50,
-                pageToken=next_page_token
-            )
-            response = request.execute()
-            for item in response['items']:
-                data = {
-                    'Playlist_Id': item['id'],
-                    'Title': item['snippet']['title'],
-                    'Channel_Id': item['snippet']['channelId'],
-                    'Channel_Name': item['snippet']['channelTitle'],
-                    'PublishedAt': item['snippet']['publishedAt'],
-                    'Video_count': item['contentDetails']['itemCount']
-                }
-                all_data.append(data)
-            next_page_token = response.get('nextPageToken')
-            if not next_page_token:
-                break
-        return all_data
-    except Exception as e:
-        st.error(f"Error fetching playlist details: {e}")
-        return []
-# Function to insert playlist details into MySQL
-def insert_playlist_details(conn, playlist_data):
-    try:
-        with conn.cursor() as cursor:
-            sql = """
-            INSERT INTO PlaylistDetails (Playlist_Id, Title, Channel_Id, Channel_Name, PublishedAt, Video_count)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            Title=VALUES(Title),
-            Channel_Id=VALUES(Channel_Id),
-            Channel_Name=VALUES(Channel_Name),
-            PublishedAt=VALUES(PublishedAt),
-            Video_count=VALUES(Video_count)
-            """
-            for data in playlist_data:
-                published_at = parse_iso_date(data['PublishedAt'])
-                cursor.execute(sql, (
-                    data['Playlist_Id'],
-                    data['Title'],
-                    data['Channel_Id'],
-                    data['Channel_Name'],
-                    published_at,
-                    data['Video_count']
-                ))
-        conn.commit()
-    except pymysql.MySQLError as e:
-        st.error(f"Error inserting playlist info into MySQL: {e}")
-# Function to get video IDs
-def get_videos_ids(youtube, channel_id):
-    try:
-        video_ids = []
-        response = youtube.channels().list(
-            id=channel_id,
-            part='contentDetails'
-        ).execute()
-        playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        next_page_token = None
-        while True:
-            response1 = youtube.playlistItems().list(
-                part='snippet',
-                playlistId=playlist_id,
-                maxResults=100,
-                pageToken=next_page_token
-            ).execute()
-            for item in response1['items']:
-                video_ids.append(item['snippet']['resourceId']['videoId'])
-            next_page_token = response1.get('nextPageToken')
-            if not next_page_token:
-                break
-        return video_ids
-    except Exception as e:
-        st.error(f"Error fetching video IDs: {e}")
-        return []
-def parse_duration(iso_duration):
-    try:
-      match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', iso_duration)
-      if not match:
-        raise ValueError(f"Invalid ISO 8601 duration format: {iso_duration}")
-
-      hours = int(match.group(1) or 0)
-      minutes = int(match.group(2) or 0)
-      seconds = int(match.group(3) or 0)
-
-      return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-    except:
-        pass
-# Function to get video information
-def get_video_info(youtube, video_ids):
-    try:
-        video_data = []
-        for video_id in video_ids:
-            request = youtube.videos().list(
-                part="snippet,statistics,contentDetails",
-                id=video_id
-            )
-            response = request.execute()
-            for item in response["items"]:
-                data = {
-                    'video_id': item['id'],
-                    'channel_Name': item['snippet']['channelTitle'],
-                    'channel_Id': item['snippet']['channelId'],
-                    'video_description': item["snippet"]["description"],
-                    'tags': item["snippet"].get("tags", []),
-                    'published_At': item["snippet"]["publishedAt"],
-                    'view_count': item["statistics"]["viewCount"],
-                    'like_count': item["statistics"].get("likeCount"),
-                    'dislike_count': item["statistics"].get("dislikeCount", 0),
-                    'favorite_count': item["statistics"]["favoriteCount"],
-                    'comment_count': item["statistics"].get("commentCount", 0),
-                    'duration': item["contentDetails"]["duration"],
-                    'thumbnail': item["snippet"]["thumbnails"]["high"]["url"],
-                    'caption_status': item["contentDetails"]["caption"]
-                }
-                video_data.append(data)
-        return video_data
-    except Exception as e:
-        st.error(f"Error fetching video info: {e}")
-        return []
-# Function to insert video information into MySQL
-def insert_video_info(conn, video_data):
-    try:
-        with conn.cursor() as cursor:
-            sql = """
-            INSERT INTO VideoInfo (video_id, channel_Name, channel_Id, video_description, tags, published_At, view_count, like_count, dislike_count, favorite_count, comment_count, duration, thumbnail, caption_status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            channel_Name=VALUES(channel_Name),
-            channel_Id=VALUES(channel_Id),
-            video_description=VALUES(video_description),
-            tags=VALUES(tags),
-            published_At=VALUES(published_At),
-            view_count=VALUES(view_count),
-            like_count=VALUES(like_count),
-            dislike_count=VALUES(dislike_count),
-            favorite_count=VALUES(favorite_count),
-            comment_count=VALUES(comment_count),
-            duration=VALUES(duration),
-            thumbnail=VALUES(thumbnail),
-            caption_status=VALUES(caption_status)
-            """
-            for data in video_data:
-                published_at = parse_iso_date(data['published_At'])
-                duration=parse_duration(data['duration'])
-                cursor.execute(sql, (
-                    data['video_id'],
-                    data['channel_Name'],
-                    data['channel_Id'],
-                    data['video_description'],
-                    ",".join(data['tags']),
-                    published_at,
-                    data['view_count'],
-                    data['like_count'],
-                    data['dislike_count'],
-                    data['favorite_count'],
-                    data['comment_count'],
-                    duration,
-                    data['thumbnail'],
-                    data['caption_status']
-                ))
-        conn.commit()
-    except pymysql.MySQLError as e:
-        st.error(f"Error inserting video info into MySQL: {e}")
-# Function to get comment information
-def get_comment_info(youtube, video_ids):
-    try:
-        comment_data = []
-        for video_id in video_ids:
-            try:
-                request = youtube.commentThreads().list(
-                    part="snippet,replies",
-                    videoId=video_id,
-                    maxResults=25
-                )
-                response = request.execute()
-                for item in response["items"]:
-                    comment = item["snippet"]["topLevelComment"]["snippet"]
-                    data = {
-                        'comment_id': item["id"],
-                        'video_id': video_id,
-                        'author': comment["authorDisplayName"],
-                        'comment_published_at': comment["publishedAt"],
-                        'comment_text': comment["textDisplay"],
-                        'like_count': comment["likeCount"],
-                        'viewer_rating': comment.get("viewerRating", "none"),
-                        'comment_updated_at': comment["updatedAt"]
-                    }
-                    comment_data.append(data)
-            except Exception as e:
-                if 'commentsDisabled' in str(e):
-                    st.warning(f"Comments are disabled for video ID {video_id}. Skipping this video.")
-                else:
-                    st.error(f"Error fetching comments for video ID {video_id}: {e}")
-        return comment_data
-    except Exception as e:
-        st.error(f"Error fetching comment info: {e}")
-        return []
-# Function to insert comment information into MySQL
-def insert_comment_info(conn, comment_data):
-    try:
-        with conn.cursor() as cursor:
-            sql = """
-            INSERT INTO CommentInfo (comment_id, video_id, author, comment_published_at, comment_text, like_count, viewer_rating, comment_updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            video_id=VALUES(video_id),
-            author=VALUES(author),
-            comment_published_at=VALUES(comment_published_at),
-            comment_text=VALUES(comment_text),
-            like_count=VALUES(like_count),
-            viewer_rating=VALUES(viewer_rating),
-            comment_updated_at=VALUES(comment_updated_at)
-            """
-            for data in comment_data:
-                published_at = parse_iso_date(data['comment_published_at'])
-                updated_at = parse_iso_date(data['comment_updated_at'])
-                cursor.execute(sql, (
-                    data['comment_id'],
-                    data['video_id'],
-                    data['author'],
-                    published_at,
-                    data['comment_text'],
-                    data['like_count'],
-                    data['viewer_rating'],
-                    updated_at
-                ))
-        conn.commit()
-    except pymysql.MySQLError as e:
-        st.error(f"Error inserting comment info into MySQL: {e}")
-# Function to execute SQL queries and return results as a DataFrame
-def execute_query(query, user, password):
-    conn = mysql_connection(user, password)
-    if conn:
-        try:
-            df = pd.read_sql(query, conn)
-            return df
-        except pymysql.MySQLError as e:
-            st.error(f"Error executing query: {e}")
-        finally:
-            conn.close()
-    return pd.DataFrame()
-
-def check_channel_id(channel_id, user, password):
-    conn = mysql_connection(user, password)
-    if conn:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT COUNT(*) FROM ChannelInfo WHERE channel_Id = %s", (channel_id,))
-            count = cursor.fetchone()[0]
-            return count > 0
-    return False
+    active = bool(jobs['status'].isin(['queued', 'running']).any())
+    if active != st.session_state.get('jobs_polling', False):
+        # Start or stop polling; run_every is fixed when the fragment is declared
+        st.session_state.jobs_polling = active
+        st.rerun()
+# Function to show the current page of the last search with paging controls
+def show_search_results(user, password):
+    if 'search' not in st.session_state:
+        return
+    scope, text, search_channel_id = st.session_state.search
+    page = st.session_state.search_page
+    df, warm, has_next = search(scope, text, user, password, search_channel_id, page)
+    if df is None:
+        st.warning("Enter at least one word of three or more letters that is not a common word.")
+        return
+    st.subheader(f"{scope} matching \"{text}\"")
+    if df.empty:
+        st.warning("No matches found.")
+        return
+    st.write(df)
+    st.caption(f"Page {page + 1} - {cache_status(warm)}")
+    col_previous, col_next = st.columns(2)
+    if col_previous.button("Previous results", disabled=page == 0):
+        st.session_state.search_page -= 1
+        st.rerun()
+    if col_next.button("Next results", disabled=not has_next):
+        st.session_state.search_page += 1
+        st.rerun()
+# Function to make a paged view the one shown below, starting from its first page
+def open_paged_view(name, params=()):
+    st.session_state.paged_view = name
+    st.session_state.paged_params = params
+    st.session_state.page_cursors = [None]
+# Function to show the current page of the open paged view with paging and export controls
+def show_paged_view(user, password):
+    name = st.session_state.get('paged_view')
+    if not name:
+        return
+    view = paged_views[name]
+    params = st.session_state.paged_params
+    cursors = st.session_state.page_cursors
+    df, warm, next_after = fetch_page(view, user, password, params, cursors[-1])
+    st.header(name)
+    if df.empty:
+        st.warning("No data found for this query.")
+    else:
+        st.write(df)
+        st.caption(f"Page {len(cursors)} - {cache_status(warm)}")
+    col_previous, col_next, col_csv, col_parquet = st.columns(4)
+    if col_previous.button("Previous page", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if col_next.button("Next page", disabled=next_after is None):
+        cursors.append(next_after)
+        st.rerun()
+    for fmt, column in (('csv', col_csv), ('parquet', col_parquet)):
+        if column.button(f"Export all rows to {fmt.upper()}"):
+            path = export_path(name, fmt, params)
+            rows = export_view(view, user, password, path, params, fmt)
+            if rows is not None:
+                st.success(f"Exported {rows} rows to {path}")
 def visualize_bar_chart(df):
+    # matplotlib takes most of a cold start, so it is only imported once a chart is drawn
+    import matplotlib.pyplot as plt
     st.caption("YouTube Channel Data Visualization - Bar Chart")
 
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -481,37 +207,16 @@ def visualize_bar_chart(df):
     plt.tight_layout()
 
     st.pyplot(fig)
-def visualize_bar_chart2(df):
-
+# Rendered video charts keyed by channel, data version and mode; the DataFrame itself is not hashed
+@st.cache_data(max_entries=64, show_spinner=False)
+def video_chart(channel_id, version, mode, _df):
+    return render_video_chart(_df, mode)
+# Function to chart a channel's videos as the top N plus "other", or summed per publish-date bin
+def visualize_bar_chart2(df, channel_id, version, mode=VIDEO_CHART_MODES[0]):
     st.caption("YouTube Video Data Visualization")
-
-    fig, ax = plt.subplots(figsize=(10, 6))  # Set figure size for clarity
-
-    # Extract video data columns
-    video_data_columns = ['view_count', 'like_count', 'comment_count']
-
-    # Create separate indices for each bar category
-    index = range(len(df))  # Use numerical indices for clarity
-    bar_width = 0.35  # Adjust bar width as needed
-
-    # Create bars with proper positioning
-    bar1 = ax.bar(index, df['view_count'], bar_width, label='Views')
-    bar2 = ax.bar([p + bar_width for p in index], df['like_count'], bar_width, label='Likes')
-    bar3 = ax.bar([p + 2 * bar_width for p in index], df['comment_count'], bar_width, label='Comments')
-
-    # Set labels and title
-    ax.set_xlabel('Video Title')
-    ax.set_ylabel('Counts')
-    ax.set_title('Video Information Bar Chart')
-
-    # Set x-axis tick labels (assuming video titles are in a column named 'title')
-    ax.set_xticks([p + bar_width for p in index])  # Adjust based on index positions
-    ax.set_xticklabels(df['video_id'], rotation=45, ha='right')  # Rotate for better readability
-
-    # Add legend and adjust layout
-    ax.legend()
-    plt.tight_layout()
-    st.pyplot(fig)
+    if df.empty:
+        return
+    st.image(video_chart(channel_id, version, mode, df))
 
 # Streamlit app
 with st.sidebar:
@@ -532,9 +237,10 @@ api_key = st.text_input("Enter your YouTube API key", type="password")
 channel_id = st.text_input("Enter YouTube channel ID")
 # Create MySQL tables button
 if st.button("Create MySQL Tables"):
-    conn = mysql_connection(db_username, db_password)
+    with db_connection(db_username, db_password) as conn:
+        if conn:
+            create_tables(conn)
     if conn:
-        create_tables(conn)
         if check_channel_id(channel_id, db_username, db_password):
             st.error("Channel ID already registered")
             update_button = st.button("Update")
@@ -545,152 +251,199 @@ if st.button("Create MySQL Tables"):
                 st.session_state.channel_id = ""
         else:
             st.success("MySQL tables created successfully")
-        conn.close()
+# Pre-flight estimate of the quota a full harvest of the channel would use
+if st.button("Estimate API Quota Cost"):
+    if api_key and channel_id:
+        channel_info = get_channel_info(youtube_client(api_key), channel_id)
+        if channel_info:
+            estimate = estimate_channel_cost(channel_info['Total_videos'])
+            remaining = get_quota_scheduler(api_key).remaining
+            st.info(
+                f"A full harvest of {channel_info['channel_Name']} ({channel_info['Total_videos']} videos) "
+                f"needs about {estimate} quota units; {remaining} units remain today."
+            )
+    else:
+        st.error("Please enter both YouTube API key and channel ID")
+# Incremental mode keeps existing rows and only fetches what changed since the last harvest
+incremental_mode = st.checkbox("Incremental update (keep existing data)", value=True)
+sync_warehouse = st.checkbox("Sync the Parquet warehouse after migrating", value=True)
 # Migrate data to MySQL button
 if st.button("Migrate Data to MYSQL"):
     if api_key and channel_id:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        conn = mysql_connection(db_username, db_password)
-        if conn:
-            clear_existing_data(conn, channel_id)  # Clear existing data for the new channel ID
-            migrate_data_to_sql(youtube, conn, channel_id)
-            conn.close()
+        # The harvest runs as a background job so the page stays usable and other channels can be queued
+        job_id = get_job_runner(db_username, db_password).submit(
+            api_key, channel_id, 'incremental' if incremental_mode else 'full', sync_warehouse=sync_warehouse
+        )
+        if job_id is not None:
+            st.success(f"Harvest of {channel_id} queued as job #{job_id}")
+            st.session_state.jobs_polling = True
+            st.session_state.jobs_shown = True
     else:
         st.error("Please enter both YouTube API key and channel ID")
+# Progress of the harvest jobs, refreshed in place while one is active
+if st.session_state.get('jobs_shown'):
+    st.fragment(show_jobs_panel, run_every=JOB_PROGRESS_INTERVAL if st.session_state.get('jobs_polling') else None)(
+        db_username, db_password, api_key
+    )
 # Show data for the entered channel ID
+video_chart_mode = st.radio("Video chart", VIDEO_CHART_MODES, horizontal=True)
 if st.button("Show Channel Data"):
     if channel_id:
-        conn = mysql_connection(db_username, db_password)
-        if conn:
-            query_channel = f"SELECT * FROM ChannelInfo WHERE channel_Id = '{channel_id}'"
-            query_playlists = f"SELECT * FROM PlaylistDetails WHERE channel_Id = '{channel_id}'"
-            query_videos = f"SELECT * FROM VideoInfo WHERE channel_Id = '{channel_id}'"
-            query_comments = f"SELECT * FROM CommentInfo WHERE video_id IN (SELECT video_id FROM VideoInfo WHERE channel_Id = '{channel_id}')"
-            try:
-                with conn.cursor() as cursor:
-                    cursor.execute(query_channel)
-                    columns_channel = [desc[0] for desc in cursor.description]
-                    df_channel = pd.DataFrame(cursor.fetchall(), columns=columns_channel)
-                    visualize_bar_chart(df_channel)
-
-                    cursor.execute(query_playlists)
-                    columns_playlists = [desc[0] for desc in cursor.description]
-                    df_playlists = pd.DataFrame(cursor.fetchall(), columns=columns_playlists)
-
-                    cursor.execute(query_videos)
-                    columns_videos = [desc[0] for desc in cursor.description]
-                    df_videos = pd.DataFrame(cursor.fetchall(), columns=columns_videos)
-                    visualize_bar_chart2(df_videos)
-
-                    cursor.execute(query_comments)
-                    columns_comments = [desc[0] for desc in cursor.description]
-                    df_comments = pd.DataFrame(cursor.fetchall(), columns=columns_comments)
-
-                st.header("Channel Information")
-                st.dataframe(df_channel)
-                st.header("Playlists")
-                st.dataframe(df_playlists)
-                st.header("Videos")
-                st.dataframe(df_videos)
-                st.header("Comments")
-                st.dataframe(df_comments)
-
-            except pymysql.MySQLError as e:
-                st.error(f"MySQL Error: {e}")
-            finally:
-                conn.close()
-        else:
-            st.error("Error connecting to MySQL. Please check your connection settings.")
+        query_channel = "SELECT * FROM ChannelInfo WHERE channel_Id = %s"
+        query_playlists = "SELECT * FROM PlaylistDetails WHERE channel_Id = %s"
+        query_videos = "SELECT * FROM VideoInfo WHERE channel_Id = %s"
+        df_channel, warm_channel = cached_query(query_channel, db_username, db_password, (channel_id,))
+        visualize_bar_chart(df_channel)
+        df_playlists, warm_playlists = cached_query(query_playlists, db_username, db_password, (channel_id,))
+        df_videos, warm_videos = cached_query(query_videos, db_username, db_password, (channel_id,))
+        visualize_bar_chart2(df_videos, channel_id, data_version(db_username, db_password), video_chart_mode)
+
+        st.header("Channel Information")
+        st.dataframe(df_channel)
+        st.caption(cache_status(warm_channel))
+        st.header("Playlists")
+        st.dataframe(df_playlists)
+        st.caption(cache_status(warm_playlists))
+        st.header("Videos")
+        st.dataframe(df_videos)
+        st.caption(cache_status(warm_videos))
+        # Comments can run into millions of rows, so they are shown page by page below
+        open_paged_view("Comments", (channel_id,))
+    else:
+        st.error("Please enter a channel ID")
+# Comments moved out of CommentInfo by the retention policy stay readable from the archive
+if st.button("Show Archived Comments"):
+    if channel_id:
+        open_paged_view("Archived comments", (channel_id,))
     else:
         st.error("Please enter a channel ID")
 
+# Full-text search over comments and videos, and tag lookups through the tag index
+st.header("Search")
+search_scope = st.radio("Search in", list(SEARCH_SCOPES), horizontal=True)
+search_text = st.text_input("Tag" if search_scope == "Tag" else "Search terms")
+search_this_channel = st.checkbox("Only the entered channel")
+if st.button("Search"):
+    st.session_state.search = (search_scope, search_text, channel_id if search_this_channel else None)
+    st.session_state.search_page = 0
+show_search_results(db_username, db_password)
+
 # Define SQL queries to fetch complete row details
-query1 = """SELECT *FROM VideoInfo"""
-query2 = """SELECT ChannelInfo.*, COUNT(VideoInfo.video_id) AS video_count FROM ChannelInfo
-        JOIN VideoInfo ON ChannelInfo.channel_Id = VideoInfo.channel_Id GROUP BY ChannelInfo.channel_Id
-        ORDER BY video_count DESC"""
+query2 = """SELECT ChannelInfo.*, ChannelSummary.video_count FROM ChannelInfo
+        JOIN ChannelSummary ON ChannelInfo.channel_Id = ChannelSummary.channel_Id
+        WHERE ChannelSummary.video_count > 0 ORDER BY video_count DESC"""
 query3 = """SELECT *FROM VideoInfo ORDER BY view_count DESC LIMIT 10"""
-query4 = """SELECT *FROM VideoInfo ORDER BY comment_count DESC"""
-query5 = """SELECT * FROM VideoInfo ORDER BY like_count DESC"""
-query6 = """SELECT *, like_count + dislike_count AS total_likes_dislikes FROM VideoInfo"""
-query7 = """SELECT ChannelInfo.*, SUM(VideoInfo.view_count) AS total_views FROM ChannelInfo
-        JOIN VideoInfo ON ChannelInfo.channel_Id = VideoInfo.channel_Id
-        GROUP BY ChannelInfo.channel_Id"""
+query7 = """SELECT ChannelInfo.*, ChannelSummary.total_views FROM ChannelInfo
+        JOIN ChannelSummary ON ChannelInfo.channel_Id = ChannelSummary.channel_Id
+        WHERE ChannelSummary.video_count > 0"""
 query8 = """SELECT DISTINCT channel_name, published_At FROM VideoInfo WHERE YEAR(published_At) = 2022"""
-query9 = """SELECT channel_name,SEC_TO_TIME(AVG(TIME_TO_SEC(duration))) AS average_duration 
-        FROM VideoInfo GROUP BY channel_name"""
+query9 = """SELECT channel_Name AS channel_name, SEC_TO_TIME(ROUND(avg_duration_seconds)) AS average_duration
+        FROM ChannelSummary WHERE video_count > 0"""
 query10 = """
         SELECT VideoInfo.video_id, VideoInfo.channel_Name, VideoInfo.comment_count
         FROM VideoInfo ORDER BY VideoInfo.comment_count DESC"""
+# Whole-table results are paged on the server with keyset pagination instead of being loaded at once
+paged_views = {
+    "All details of all videos": KeysetView("SELECT * FROM VideoInfo", key_column='video_id'),
+    "Videos with most comments": KeysetView(
+        "SELECT * FROM VideoInfo", key_column='video_id', sort_column='comment_count', descending=True
+    ),
+    "Videos with highest likes": KeysetView(
+        "SELECT * FROM VideoInfo", key_column='video_id', sort_column='like_count', descending=True
+    ),
+    "Total likes and dislikes for each video": KeysetView(
+        "SELECT *, like_count + dislike_count AS total_likes_dislikes FROM VideoInfo", key_column='video_id'
+    ),
+    # Both comment tables are keyed by (channel_Id, comment_id), so a channel's pages are one range read
+    "Comments": KeysetView("SELECT * FROM CommentInfo", key_column='comment_id', where="channel_Id = %s"),
+    "Archived comments": KeysetView("SELECT * FROM CommentArchive", key_column='comment_id', where="channel_Id = %s"),
+}
 # Streamlit sidebar and buttons for executing queries
 st.sidebar.header("SQL Queries")
 if st.sidebar.button("All details of all videos"):
-    df = execute_query(query1, db_username, db_password)
-    if not df.empty:
-        st.header("All details of all videos")
-        st.write(df)
-    else:
-        st.warning("No data found for this query.")
+    open_paged_view("All details of all videos")
 if st.sidebar.button("Channels with most videos"):
-    df = execute_query(query2, db_username, db_password)
+    df, warm = cached_query(query2, db_username, db_password)
     if not df.empty:
         st.header("Channels with most videos")
         st.write(df)
+        st.caption(cache_status(warm))
     else:
         st.warning("No data found for this query.")
 if st.sidebar.button("Top 10 most viewed videos"):
-    df = execute_query(query3, db_username, db_password)
+    df, warm = cached_query(query3, db_username, db_password)
     if not df.empty:
         st.header("Top 10 most viewed videos")
         st.write(df)
+        st.caption(cache_status(warm))
     else:
         st.warning("No data found for this query.")
 if st.sidebar.button("Videos with most comments"):
-    df = execute_query(query4, db_username, db_password)
-    if not df.empty:
-        st.header("Videos with most comments")
-        st.write(df)
-    else:
-        st.warning("No data found for this query.")
+    open_paged_view("Videos with most comments")
 if st.sidebar.button("Videos with highest likes"):
-    df = execute_query(query5, db_username, db_password)
-    if not df.empty:
-        st.header("Videos with highest likes")
-        st.write(df)
-    else:
-        st.warning("No data found for this query.")
+    open_paged_view("Videos with highest likes")
 if st.sidebar.button("Total likes and dislikes for each video"):
-    df = execute_query(query6, db_username, db_password)
-    if not df.empty:
-        st.header("Total likes and dislikes for each video")
-        st.write(df)
-    else:
-        st.warning("No data found for this query.")
+    open_paged_view("Total likes and dislikes for each video")
 if st.sidebar.button("Total views for each channel"):
-    df = execute_query(query7, db_username, db_password)
+    df, warm = cached_query(query7, db_username, db_password)
     if not df.empty:
         st.header("Total views for each channel")
         st.write(df)
+        st.caption(cache_status(warm))
     else:
         st.warning("No data found for this query.")
 if st.sidebar.button("Channels with videos published in 2022"):
-    df = execute_query(query8, db_username, db_password)
+    df, warm = cached_query(query8, db_username, db_password)
     if not df.empty:
         st.header("Channels with videos published in 2022")
         st.write(df)
+        st.caption(cache_status(warm))
     else:
         st.warning("No data found for this query.")
 if st.sidebar.button("Average duration of videos in each channel"):
-    df = execute_query(query9, db_username, db_password)
+    df, warm = cached_query(query9, db_username, db_password)
     if not df.empty:
         st.header("Average duration of videos in each channel")
         st.write(df)
+        st.caption(cache_status(warm))
     else:
         st.warning("No data found for this query.")
 if st.sidebar.button("Videos with highest comments"):
-    df = execute_query(query10, db_username, db_password)
+    df, warm = cached_query(query10, db_username, db_password)
     if not df.empty:
         st.header("Videos with highest comments")
         st.write(df)
+        st.caption(cache_status(warm))
     else:
         st.warning("No data found for this query.")
+# Growth over a window, answered from the append-only counter snapshots taken at every harvest
+st.sidebar.header("Growth")
+growth_days = st.sidebar.number_input("Window (days)", min_value=1, max_value=365, value=7)
+if st.sidebar.button("Top gaining videos"):
+    df, warm = cached_query(TOP_GAINERS_QUERY, db_username, db_password, growth_params(growth_days, limit=20))
+    if not df.empty:
+        st.header(f"Top gaining videos in the last {growth_days} days")
+        st.write(df)
+        st.caption(cache_status(warm))
+    else:
+        st.warning("No counter changes recorded in this window.")
+if st.sidebar.button("Channel growth"):
+    df, warm = cached_query(CHANNEL_GROWTH_QUERY, db_username, db_password, growth_params(growth_days))
+    if not df.empty:
+        st.header(f"Channel growth in the last {growth_days} days")
+        st.write(df)
+        st.caption(cache_status(warm))
+    else:
+        st.warning("No counter changes recorded in this window.")
+# The same queries answered from the Parquet warehouse, reading only the columns and partitions they need
+st.sidebar.header("Parquet Warehouse")
+warehouse_query = st.sidebar.selectbox("Query", list(WAREHOUSE_QUERIES))
+if st.sidebar.button("Run on Parquet warehouse"):
+    df = run_warehouse_query(warehouse_query)
+    if df is not None and not df.empty:
+        st.header(f"{warehouse_query} (Parquet warehouse)")
+        st.dataframe(df)
+    elif df is not None:
+        st.warning("No data found in the Parquet warehouse. Migrate a channel with warehouse sync enabled first.")
+# Paged result viewer for the whole-table queries and channel comments
+show_paged_view(db_username, db_password)